@@ -4,6 +4,8 @@ import matplotlib.animation as animation
 
 import time
 
+import DoublePendulumPversion as DPend
+
 # set up initial state and global variables
 pendulum = DPend.DoublePendulum([180., 0.0, -20., 0.0])
 dt = 1./60 # 60 fps
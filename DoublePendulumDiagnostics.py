@@ -0,0 +1,85 @@
+# Double pendulum diagnostics
+# Conserved-quantity checks evaluated on whole trajectories. Every function takes a
+# (..., 4) array of [theta1, w1, theta2, w2] states, so a single state, a (T, 4)
+# trajectory and a (T, N, 4) ensemble are all handled by the same array expressions.
+import numpy as np
+from numpy import cos
+
+from DoublePendulumEnsemble import Energy, g
+
+def Diagnostics(z, L1, L2, m1, m2, g=g):
+    '''
+    Kinetic, potential and total energy, the angular momentum about the pivot and
+    the canonical momenta p1, p2 of every state, as a dict of (...) arrays
+    '''
+    theta1, w1, theta2, w2 = z[..., 0], z[..., 1], z[..., 2], z[..., 3]
+    M = m1 + m2
+    c12 = cos(theta1 - theta2)
+    K = 0.5*M*L1**2*w1**2 + 0.5*m2*L2**2*w2**2 + m2*L1*L2*w1*w2*c12
+    U = -M*g*L1*cos(theta1) - m2*g*L2*cos(theta2)
+    p1 = M*L1**2*w1 + m2*L1*L2*w2*c12
+    p2 = m2*L2**2*w2 + m2*L1*L2*w1*c12
+    # r x (m v) summed over both bobs, about the pivot
+    Lz = M*L1**2*w1 + m2*L2**2*w2 + m2*L1*L2*(w1 + w2)*c12
+    return {'K': K, 'U': U, 'E': K + U, 'Lz': Lz, 'p1': p1, 'p2': p2}
+
+def EnergyScale(L1, L2, m1, m2, g=g):
+    '''
+    characteristic energy of the pendulum, the potential energy it gains when both arms
+    are lifted from hanging down to the height of the pivot
+    '''
+    return (m1 + m2)*g*L1 + m2*g*L2
+
+def RelativeDrift(E, axis=0, scale=0.):
+    '''
+    |E(t) - E(0)| / max(|E(0)|, scale) along the time axis. With the potential zero at
+    the pivot, E(0) is about 0 for starts such as both arms horizontal, so pass
+    EnergyScale as scale to keep the drift from being divided by rounding noise
+    '''
+    E = np.asarray(E)
+    E0 = np.take(E, [0], axis=axis)
+    scale = np.maximum(np.abs(E0), scale)
+    scale[scale == 0] = 1.
+    return np.abs(E - E0)/scale
+
+def FirstExceed(drift, threshold, axis=0):
+    '''index of the first step where drift > threshold along axis, -1 where it never does'''
+    over = np.asarray(drift) > threshold
+    first = np.argmax(over, axis=axis)
+    return np.where(over.any(axis=axis), first, -1)
+
+def EnergyDrift(z, L1, L2, m1, m2, g=g, threshold=None):
+    '''
+    Relative energy drift of a (T, 4) trajectory or (T, N, 4) ensemble, time on axis 0,
+    relative to |E(0)| or EnergyScale, whichever is larger. With a threshold also
+    returns the first step where the drift exceeds it.
+    '''
+    drift = RelativeDrift(Energy(z, L1, L2, m1, m2, g), scale=EnergyScale(L1, L2, m1, m2, g))
+    if threshold is None:
+        return drift
+    return drift, FirstExceed(drift, threshold)
+
+class DriftTracker:
+    '''
+    Online energy drift check for production runs. Call Update(z) after each step
+    (or every few steps) with the current state, single or (N, 4). The step at which
+    each member's relative drift (as in EnergyDrift) first went over threshold ends up
+    in flagged (-1 if it never did), and the largest drift seen in maxDrift.
+    '''
+    def __init__(self, z0, L1, L2, m1, m2, g=g, threshold=1e-6):
+        self.params = (L1, L2, m1, m2, g)
+        self.threshold = threshold
+        self.E0 = Energy(np.asarray(z0, dtype='float'), *self.params)
+        self.scale = np.maximum(np.abs(self.E0), EnergyScale(L1, L2, m1, m2, g))
+        self.maxDrift = np.zeros(np.shape(self.E0))
+        self.flagged = np.full(np.shape(self.E0), -1)
+        self.step = 0
+
+    def Update(self, z):
+        '''record the drift of the state z, returns True if any member is newly flagged'''
+        self.step += 1
+        drift = np.abs(Energy(z, *self.params) - self.E0)/self.scale
+        np.maximum(self.maxDrift, drift, out=self.maxDrift)
+        new = (drift > self.threshold) & (self.flagged < 0)
+        self.flagged = np.where(new, self.step, self.flagged)
+        return bool(np.any(new))
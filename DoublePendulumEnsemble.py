@@ -0,0 +1,182 @@
+# Double pendulum ensembles
+# Advances many double pendulums together. The state is an (N, 4) array whose rows are
+# [theta1, w1, theta2, w2], with the same equations of motion as Polar in DoublePendulum1.py.
+# L1, L2, m1, m2 can be scalars or (N,) arrays, so every member may have its own parameters.
+import numpy as np
+from numpy import cos, sin, pi
+import matplotlib.pyplot as plt
+import time
+
+from Integrators import RungeKutta
+
+g = 9.81 # Acceleration due to gravity
+
+def PolarBatch(z, L1, L2, m1, m2, g=g, out=None):
+    '''Polar equations of motion evaluated on a (..., 4) array of states'''
+    theta1, w1, theta2, w2 = z[..., 0], z[..., 1], z[..., 2], z[..., 3]
+    if out is None:
+        out = np.empty_like(z)
+    cos12 = cos(theta1 - theta2)
+    sin12 = sin(theta1 - theta2)
+    sin1 = sin(theta1)
+    sin2 = sin(theta2)
+    M = m1 + m2
+    xi = cos12**2*m2 - M
+    out[..., 0] = w1
+    out[..., 1] = ( L1*m2*cos12*sin12*w1**2 + L2*m2*sin12*w2**2
+                  - m2*g*cos12*sin2 + M*g*sin1)/(L1*xi)
+    out[..., 2] = w2
+    out[..., 3] = -( L2*m2*cos12*sin12*w2**2 + L1*M*sin12*w1**2
+                   + M*g*sin1*cos12 - M*g*sin2)/(L2*xi)
+    return out
+
+def PolarJacobianBatch(z, L1, L2, m1, m2, g=g):
+    '''closed-form (..., 4, 4) Jacobian of PolarBatch with respect to the state'''
+    theta1, w1, theta2, w2 = z[..., 0], z[..., 1], z[..., 2], z[..., 3]
+    c = cos(theta1 - theta2)
+    s = sin(theta1 - theta2)
+    cc = c*c - s*s # cos(2*(theta1 - theta2))
+    sin1, cos1 = sin(theta1), cos(theta1)
+    sin2, cos2 = sin(theta2), cos(theta2)
+    M = m1 + m2
+    xi = c**2*m2 - M
+    dxi = -2*m2*c*s # d(xi)/d(theta1), and -d(xi)/d(theta2)
+    # w1dot = A/(L1*xi) and w2dot = -B/(L2*xi)
+    A = L1*m2*c*s*w1**2 + L2*m2*s*w2**2 - m2*g*c*sin2 + M*g*sin1
+    B = L2*m2*c*s*w2**2 + L1*M*s*w1**2 + M*g*sin1*c - M*g*sin2
+    w1dot = A/(L1*xi)
+    w2dot = -B/(L2*xi)
+    dA1 = L1*m2*cc*w1**2 + L2*m2*c*w2**2 + m2*g*s*sin2 + M*g*cos1
+    dA2 = -L1*m2*cc*w1**2 - L2*m2*c*w2**2 - m2*g*(s*sin2 + c*cos2)
+    dB1 = L2*m2*cc*w2**2 + L1*M*c*w1**2 + M*g*(cos1*c - sin1*s)
+    dB2 = -L2*m2*cc*w2**2 - L1*M*c*w1**2 + M*g*(sin1*s - cos2)
+    J = np.zeros(np.shape(theta1) + (4, 4))
+    J[..., 0, 1] = 1.
+    J[..., 2, 3] = 1.
+    J[..., 1, 0] = (dA1 - w1dot*L1*dxi)/(L1*xi)
+    J[..., 1, 1] = 2*L1*m2*c*s*w1/(L1*xi)
+    J[..., 1, 2] = (dA2 + w1dot*L1*dxi)/(L1*xi)
+    J[..., 1, 3] = 2*L2*m2*s*w2/(L1*xi)
+    J[..., 3, 0] = -(dB1 + w2dot*L2*dxi)/(L2*xi)
+    J[..., 3, 1] = -2*L1*M*s*w1/(L2*xi)
+    J[..., 3, 2] = -(dB2 - w2dot*L2*dxi)/(L2*xi)
+    J[..., 3, 3] = -2*L2*m2*c*s*w2/(L2*xi)
+    return J
+
+def Broadcast(z0, *params):
+    '''Return z0 as an (N, 4) float array and every parameter as an (N,) array'''
+    z = np.array(z0, dtype='float', ndmin=2)
+    if z.shape[-1] != 4 or z.ndim != 2:
+        raise ValueError('z0 must have shape (N, 4), got {0}'.format(z.shape))
+    n = z.shape[0]
+    return (z,) + tuple(np.broadcast_to(np.asarray(p, dtype='float'), (n,)).copy()
+                        for p in params)
+
+class EnsembleRK4:
+    '''
+    Fixed step RK4 for an (N, 4) ensemble of double pendulums, on the shared
+    tableau integrator, whose stage buffers are allocated once and reused.
+    '''
+    def __init__(self, z0, L1=1., L2=2., m1=3., m2=1., g=g):
+        self.z, self.L1, self.L2, self.m1, self.m2 = Broadcast(z0, L1, L2, m1, m2)
+        self.g = g
+        self.rk = RungeKutta(lambda t, z, out: self.Rhs(z, out), 'rk4')
+
+    def Rhs(self, z, out):
+        return PolarBatch(z, self.L1, self.L2, self.m1, self.m2, self.g, out=out)
+
+    def Step(self, dt):
+        '''advance every member by dt in place'''
+        return self.rk.Step(0., self.z, dt)
+
+    def Keep(self, mask):
+        '''drop the members where mask is False'''
+        self.z, self.L1, self.L2, self.m1, self.m2 = (a[mask] for a in
+            (self.z, self.L1, self.L2, self.m1, self.m2))
+
+def EnsembleStream(z0, t, L1=1., L2=2., m1=3., m2=1., g=g, substeps=1):
+    '''
+    Yield (t[i], z) for every time in t, where z is the (N, 4) ensemble state.
+    z is the live integrator buffer, copy it if it has to outlive the next step.
+    '''
+    stepper = EnsembleRK4(z0, L1, L2, m1, m2, g)
+    yield t[0], stepper.z
+    for i in range(1, len(t)):
+        h = (t[i] - t[i-1])/substeps
+        for _ in range(substeps):
+            stepper.Step(h)
+        yield t[i], stepper.z
+
+def EnsembleIntegrate(z0, t, L1=1., L2=2., m1=3., m2=1., g=g, substeps=1):
+    '''odeint-like batched solve, returns the (T, N, 4) trajectory of the ensemble'''
+    t = np.asarray(t, dtype='float')
+    z = None
+    for i, (_, zi) in enumerate(EnsembleStream(z0, t, L1, L2, m1, m2, g, substeps)):
+        if z is None:
+            z = np.empty((len(t),) + zi.shape)
+        z[i] = zi
+    return z
+
+def Energy(z, L1, L2, m1, m2, g=g):
+    '''total energy of (..., 4) states, zero potential at the pivot'''
+    theta1, w1, theta2, w2 = z[..., 0], z[..., 1], z[..., 2], z[..., 3]
+    M = m1 + m2
+    K = (0.5*M*L1**2*w1**2 + 0.5*m2*L2**2*w2**2
+         + m2*L1*L2*w1*w2*cos(theta1 - theta2))
+    U = -M*g*L1*cos(theta1) - m2*g*L2*cos(theta2)
+    return K + U
+
+def FlipTime(z0, tstop, dt, L1=1., L2=2., m1=3., m2=1., g=g):
+    '''
+    Time until either arm first goes over the top (|theta| passes pi) for each member.
+    Members that never flip before tstop get nan. Finished members are dropped from
+    the ensemble as they flip, and members without the energy to ever flip are never
+    integrated at all.
+    '''
+    z, L1, L2, m1, m2 = Broadcast(z0, L1, L2, m1, m2)
+    flip = np.full(z.shape[0], np.nan)
+    # Cheapest configuration with one arm pointing straight up.
+    M = m1 + m2
+    Eflip = np.minimum(M*g*L1 - m2*g*L2, -M*g*L1 + m2*g*L2)
+    flip[(np.abs(z[:, 0]) > pi) | (np.abs(z[:, 2]) > pi)] = 0.
+    active = np.nonzero(np.isnan(flip) & (Energy(z, L1, L2, m1, m2, g) >= Eflip))[0]
+    stepper = EnsembleRK4(z[active], L1[active], L2[active], m1[active], m2[active], g)
+    t = 0.
+    while active.size and t < tstop:
+        stepper.Step(dt)
+        t += dt
+        done = (np.abs(stepper.z[:, 0]) > pi) | (np.abs(stepper.z[:, 2]) > pi)
+        if done.any():
+            flip[active[done]] = t
+            active = active[~done]
+            stepper.Keep(~done)
+    return flip
+
+def FlipTimeMap(n=200, tstop=50., dt=0.01, L1=1., L2=1., m1=1., m2=1., g=g):
+    '''
+    Flip time image for the pendulum released from rest at every (theta1, theta2)
+    on an n x n grid over [-pi, pi]^2. Rows are theta2, columns are theta1.
+    '''
+    theta = np.linspace(-pi, pi, n)
+    theta1, theta2 = np.meshgrid(theta, theta)
+    z0 = np.zeros((n*n, 4))
+    z0[:, 0] = theta1.ravel()
+    z0[:, 2] = theta2.ravel()
+    return FlipTime(z0, tstop, dt, L1, L2, m1, m2, g).reshape(n, n)
+
+def PlotFlipTimeMap(flip, filename='FlipTimeMap.png', dpi=150):
+    '''save a log-coloured flip time image, never flipped pixels are left white'''
+    plt.figure(figsize=(6, 6), dpi=dpi)
+    plt.imshow(np.log10(flip), origin='lower', extent=(-pi, pi, -pi, pi),
+               cmap='viridis')
+    plt.colorbar(label=r"log10 time to first flip [s]")
+    plt.xlabel(r"theta1 [rad]")
+    plt.ylabel(r"theta2 [rad]")
+    plt.title('Double pendulum flip time')
+    plt.savefig(filename, format='png')
+
+if __name__ == "__main__":
+    start = time.time()
+    flip = FlipTimeMap(n=200, tstop=20.)
+    print('Flip map done in {0} s.'.format(time.time() - start))
+    PlotFlipTimeMap(flip)
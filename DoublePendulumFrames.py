@@ -0,0 +1,166 @@
+# Double pendulum frame export
+# Draws the animation frames of DoublePendulum1.py. The rod, the three circles and the
+# fading trail are created once, and every frame only moves them. Frames are shared out
+# over a process pool, each worker with its own figure. They are saved as PNGs or
+# streamed as raw RGB buffers into a single GIF/video writer.
+import numpy as np
+import subprocess
+import multiprocessing
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.patches import Circle
+
+class FrameRenderer:
+    '''
+    Reusable figure for the double pendulum configuration at time index i.
+    x1, y1, x2, y2 are the bob trajectories, dt their time step.
+    '''
+    def __init__(self, x1, y1, x2, y2, L1, L2, dt, r=0.1, trail_secs=1, ns=20,
+                 figsize=(8.3333, 6.25), dpi=72):
+        self.x1, self.y1, self.x2, self.y2 = x1, y1, x2, y2
+        self.dpi = dpi
+        # The trail is divided into ns segments and plotted as a fading line.
+        self.ns = ns
+        self.s = int(trail_secs / dt) // ns
+
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        ax = self.ax = self.fig.add_subplot(111)
+        self.rod, = ax.plot([], [], lw=2, c='k')
+        # Circles representing the hang point of rod 1, and bobs 1 and 2.
+        ax.add_patch(Circle((0, 0), r/2, fc='k', zorder=10))
+        self.c1 = Circle((0, 0), r, fc='b', ec='b', zorder=10)
+        self.c2 = Circle((0, 0), r, fc='r', ec='r', zorder=10)
+        ax.add_patch(self.c1)
+        ax.add_patch(self.c2)
+        # The fading looks better if we square the fractional length along the trail.
+        self.trail = [ax.plot([], [], c='r', solid_capstyle='butt', lw=2,
+                              alpha=(j/ns)**2)[0] for j in range(ns)]
+        ax.set_xlim(-L1-L2-r, L1+L2+r)
+        ax.set_ylim(-L1-L2-r, L1+L2+r)
+        ax.set_aspect('equal', adjustable='box')
+        ax.axis('off')
+
+    def Draw(self, i):
+        '''move the artists to time index i'''
+        x1, y1, x2, y2 = self.x1, self.y1, self.x2, self.y2
+        self.rod.set_data([0, x1[i], x2[i]], [0, y1[i], y2[i]])
+        self.c1.center = (x1[i], y1[i])
+        self.c2.center = (x2[i], y2[i])
+        ns, s = self.ns, self.s
+        for j, line in enumerate(self.trail):
+            imin = i - (ns-j)*s
+            if imin < 0:
+                line.set_data([], [])
+                continue
+            imax = imin + s + 1
+            line.set_data(x2[imin:imax], y2[imin:imax])
+
+    def Rgb(self, i):
+        '''frame i as an (height, width, 3) uint8 array'''
+        self.Draw(i)
+        self.canvas.draw()
+        return np.asarray(self.canvas.buffer_rgba())[..., :3].copy()
+
+    def Save(self, i, filename):
+        self.Draw(i)
+        self.fig.savefig(filename, dpi=self.dpi)
+
+# Each pool worker keeps its own renderer in this global.
+_renderer = None
+
+def _InitWorker(args, kwargs):
+    global _renderer
+    _renderer = FrameRenderer(*args, **kwargs)
+
+def _SaveFrames(job):
+    for k, i, filename in job:
+        _renderer.Save(i, filename)
+    return len(job)
+
+def _RgbFrame(i):
+    return _renderer.Rgb(i)
+
+def Chunks(items, n):
+    '''split items into n contiguous, nearly equal chunks'''
+    items = list(items)
+    bounds = np.linspace(0, len(items), n + 1).astype(int)
+    return [items[a:b] for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+def ExportFrames(x1, y1, x2, y2, L1, L2, dt, frames, pattern='frames_img{:04d}.png',
+                 processes=None, **kwargs):
+    '''
+    Save the frames with time indices in frames as PNG files, the k-th frame to
+    pattern.format(k). The frame list is split into one contiguous block per process.
+    '''
+    processes = processes or multiprocessing.cpu_count()
+    jobs = [(k, i, pattern.format(k)) for k, i in enumerate(frames)]
+    args = (x1, y1, x2, y2, L1, L2, dt)
+    if processes == 1:
+        _InitWorker(args, kwargs)
+        return _SaveFrames(jobs)
+    with multiprocessing.Pool(processes, _InitWorker, (args, kwargs)) as pool:
+        return sum(pool.map(_SaveFrames, Chunks(jobs, processes)))
+
+def RenderFrames(x1, y1, x2, y2, L1, L2, dt, frames, processes=None, **kwargs):
+    '''yield the RGB buffer of every frame in order, rendered by a process pool'''
+    processes = processes or multiprocessing.cpu_count()
+    args = (x1, y1, x2, y2, L1, L2, dt)
+    if processes == 1:
+        renderer = FrameRenderer(*args, **kwargs)
+        for i in frames:
+            yield renderer.Rgb(i)
+        return
+    frames = list(frames)
+    chunksize = max(1, len(frames) // (4*processes))
+    with multiprocessing.Pool(processes, _InitWorker, (args, kwargs)) as pool:
+        for rgb in pool.imap(_RgbFrame, frames, chunksize):
+            yield rgb
+
+def WriteGif(rgbs, filename, fps=10, colors=64):
+    '''
+    Write the RGB frames as a looping GIF one frame at a time, each quantized to its
+    own palette of colors colours. PIL's save(append_images=...) keeps every frame
+    until the end to compare neighbours, so the file is put together from PIL's
+    header and frame encoders instead and only one frame is ever held.
+    '''
+    from PIL import Image, GifImagePlugin
+    count = 0
+    with open(filename, 'wb') as f:
+        for rgb in rgbs:
+            image = Image.fromarray(rgb).quantize(colors=colors)
+            if count == 0:
+                header, _ = GifImagePlugin.getheader(image, info={'loop': 0})
+                f.write(b''.join(header))
+            for data in GifImagePlugin.getdata(image, duration=int(1000/fps), include_color_table=True):
+                f.write(data)
+            count += 1
+        f.write(b';')
+    return count
+
+def WriteAnimation(x1, y1, x2, y2, L1, L2, dt, frames, filename='DoublePendulum.gif',
+                   fps=10, processes=None, **kwargs):
+    '''
+    Stream the frames into one animation file without temporary images.
+    A .gif is encoded with PIL, anything else is piped to ffmpeg as raw RGB video.
+    '''
+    rgbs = RenderFrames(x1, y1, x2, y2, L1, L2, dt, frames, processes, **kwargs)
+    if filename.lower().endswith('.gif'):
+        return WriteGif(rgbs, filename, fps)
+    count = 0
+    proc = None
+    for rgb in rgbs:
+        if proc is None:
+            h, w = rgb.shape[:2]
+            proc = subprocess.Popen(['ffmpeg', '-y', '-loglevel', 'error',
+                                     '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                                     '-s', '{0}x{1}'.format(w, h), '-r', str(fps),
+                                     '-i', '-', '-vcodec', 'libx264',
+                                     '-pix_fmt', 'yuv420p', filename],
+                                    stdin=subprocess.PIPE)
+        proc.stdin.write(rgb.tobytes())
+        count += 1
+    if proc is not None:
+        proc.stdin.close()
+        proc.wait()
+    return count
@@ -0,0 +1,98 @@
+# Lyapunov exponents of the double pendulum
+# The variational equations dQ/dt = J(z) Q are integrated together with the Polar equations
+# of motion, for a whole batch of initial conditions at once. The tangent vectors Q are
+# re-orthonormalised every few steps, and the logs of the stretching factors are
+# accumulated (the Benettin / QR method). k = 1 gives the maximal exponent, and k = 4
+# gives the full spectrum.
+import numpy as np
+from numpy import pi
+import matplotlib.pyplot as plt
+import time
+
+from DoublePendulumEnsemble import PolarBatch, PolarJacobianBatch, Broadcast, g
+from Integrators import RungeKutta
+
+def GramSchmidt(Q):
+    '''
+    QR of a stack of (n, k) matrices by modified Gram-Schmidt, done in place on Q.
+    Returns the (..., k) diagonal of R. Written out by hand so it also batches on
+    numpy versions whose linalg.qr only takes single matrices.
+    '''
+    k = Q.shape[-1]
+    R = np.empty(Q.shape[:-2] + (k,))
+    for i in range(k):
+        qi = Q[..., :, i]
+        for j in range(i):
+            qj = Q[..., :, j]
+            qi -= np.sum(qi*qj, axis=-1)[..., None]*qj
+        R[..., i] = np.sqrt(np.sum(qi*qi, axis=-1))
+        qi /= R[..., i][..., None]
+    return R
+
+class TangentRK4:
+    '''
+    fixed step RK4 for the (N, 4) states together with their (N, 4, k) tangent vectors.
+    Both are stacked in one (N, 4, 1 + k) state for the shared integrator, z and Q are
+    views of it
+    '''
+    def __init__(self, z0, k, L1, L2, m1, m2, g=g):
+        z, self.L1, self.L2, self.m1, self.m2 = Broadcast(z0, L1, L2, m1, m2)
+        self.g = g
+        self.y = np.zeros(z.shape + (1 + k,))
+        self.y[:, :, 0] = z
+        self.y[:, :k, 1:] = np.eye(4)[:k, :k]
+        self.z, self.Q = self.y[:, :, 0], self.y[:, :, 1:]
+        self.rk = RungeKutta(lambda t, y, out: self.Rhs(y, out), 'rk4')
+
+    def Rhs(self, y, out):
+        p = (self.L1, self.L2, self.m1, self.m2, self.g)
+        z = y[:, :, 0]
+        out[:, :, 0] = PolarBatch(z, *p)
+        np.matmul(PolarJacobianBatch(z, *p), y[:, :, 1:], out=out[:, :, 1:])
+        return out
+
+    def Step(self, dt):
+        self.rk.Step(0., self.y, dt)
+
+def Lyapunov(z0, tstop, dt, k=1, renorm=10, L1=1., L2=1., m1=1., m2=1., g=g):
+    '''
+    The k largest Lyapunov exponents (N, k) of every initial condition in the (N, 4)
+    array z0, from a run of length tstop with step dt, renormalising every renorm steps.
+    '''
+    stepper = TangentRK4(z0, k, L1, L2, m1, m2, g)
+    logs = np.zeros(stepper.Q.shape[::2])
+    nSteps = int(round(tstop/dt))
+    for i in range(1, nSteps + 1):
+        stepper.Step(dt)
+        if i % renorm == 0 or i == nSteps:
+            logs += np.log(GramSchmidt(stepper.Q))
+    return logs/(nSteps*dt)
+
+def LyapunovMap(n=100, tstop=50., dt=0.01, k=1, renorm=10, L1=1., L2=1., m1=1., m2=1., g=g):
+    '''
+    Lyapunov exponents of the pendulum released from rest at every (theta1, theta2)
+    on an n x n grid over [-pi, pi]^2. Returns (n, n) for k = 1 and (n, n, k) otherwise,
+    rows are theta2, columns are theta1.
+    '''
+    theta = np.linspace(-pi, pi, n)
+    theta1, theta2 = np.meshgrid(theta, theta)
+    z0 = np.zeros((n*n, 4))
+    z0[:, 0] = theta1.ravel()
+    z0[:, 2] = theta2.ravel()
+    lyap = Lyapunov(z0, tstop, dt, k, renorm, L1, L2, m1, m2, g)
+    return lyap.reshape(n, n) if k == 1 else lyap.reshape(n, n, k)
+
+def PlotLyapunovMap(lyap, filename='LyapunovMap.png', dpi=150):
+    plt.figure(figsize=(6, 6), dpi=dpi)
+    plt.imshow(lyap, origin='lower', extent=(-pi, pi, -pi, pi), cmap='magma')
+    plt.colorbar(label=r"maximal Lyapunov exponent [1/s]")
+    plt.xlabel(r"theta1 [rad]")
+    plt.ylabel(r"theta2 [rad]")
+    plt.title('Double pendulum chaos map')
+    plt.savefig(filename, format='png')
+
+if __name__ == "__main__":
+    start = time.time()
+    lyap = LyapunovMap(n=100, tstop=20.)
+    print('Lyapunov map done in {0} s.'.format(time.time() - start))
+    PlotLyapunovMap(lyap)
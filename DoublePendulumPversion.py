@@ -1,6 +1,9 @@
 import numpy as np
 import scipy.integrate as integrate
 
+from DoublePendulumEnsemble import PolarJacobianBatch, Energy
+from Integrators import RungeKutta
+
 class DoublePendulum:
     '''
     Double Pendulum Class
@@ -8,6 +11,11 @@ class DoublePendulum:
     initState is [theta1, omega1, theta2, omega2] in degrees,
     where theta1, omega1 is the angular position and velocity of the first
     pendulum arm, and theta2, omega2 is that of the second pendulum arm
+
+    method picks the integrator used by Step, 'odeint' or one of the
+    Stepper schemes ('rk4', 'dopri5', 'midpoint'). The default 'dopri5'
+    controls its error like odeint does; 'rk4' is cheaper but its error grows
+    with the step the caller picks
     '''
     def __init__(self,
                  initState = [120, 0, -20, 0],
@@ -16,13 +24,18 @@ class DoublePendulum:
                  M1=1.0,  # mass of pendulum 1 in kg
                  M2=1.0,  # mass of pendulum 2 in kg
                  G=9.8,  # acceleration due to gravity, in m/s^2
-                 origin=(0, 0)): 
+                 origin=(0, 0),
+                 method='dopri5'): 
         self.initState = np.asarray(initState, dtype='float')
         self.params = (L1, L2, M1, M2, G)
         self.origin = origin
         self.timeElapsed = 0
 
         self.state = self.initState * np.pi / 180.
+        self.method = method
+        if method != 'odeint':
+            self.stepper = Stepper(self.DstateDtInto, self.state, method=method,
+                                   params=self.params)
     
     def Position(self):
         '''compute the current x,y positions of the pendulum arms'''
@@ -39,49 +52,185 @@ class DoublePendulum:
     def Energy(self):
         '''compute the energy of the current state'''
         (L1, L2, M1, M2, G) = self.params
-
-        x = np.cumsum([L1 * np.sin(self.state[0]),
-                       L2 * np.sin(self.state[2])])
-        y = np.cumsum([-L1 * np.cos(self.state[0]),
-                       -L2 * np.cos(self.state[2])])
-        vx = np.cumsum([L1 * self.state[1] * np.cos(self.state[0]),
-                        L2 * self.state[3] * np.cos(self.state[2])])
-        vy = np.cumsum([L1 * self.state[1] * np.sin(self.state[0]),
-                        L2 * self.state[3] * np.sin(self.state[2])])
-
-        U = G * (M1 * y[0] + M2 * y[1])
-        K = 0.5 * (M1 * np.dot(vx, vx) + M2 * np.dot(vy, vy))
-
-        return U + K
+        return Energy(self.state, L1, L2, M1, M2, G)
 
     def DstateDt(self, state, t):
         '''compute the derivative of the given state'''
-        (M1, M2, L1, L2, G) = self.params
+        return self.DstateDtInto(state, np.zeros_like(state))
+
+    def DstateDtInto(self, state, dydx):
+        '''
+        write the derivative of state into dydx, state may be a single
+        [theta1, omega1, theta2, omega2] or a (..., 4) batch of them
+        '''
+        (L1, L2, M1, M2, G) = self.params
 
-        dydx = np.zeros_like(state)
-        dydx[0] = state[1]
-        dydx[2] = state[3]
+        theta1, omega1 = state[..., 0], state[..., 1]
+        theta2, omega2 = state[..., 2], state[..., 3]
 
-        cosDelta = np.cos(state[2] - state[0])
-        sinDelta = np.sin(state[2] - state[0])
+        cosDelta = np.cos(theta2 - theta1)
+        sinDelta = np.sin(theta2 - theta1)
 
         den1 = (M1 + M2) * L1 - M2 * L1 * cosDelta * cosDelta
-        dydx[1] = (M2 * L1 * state[1] * state[1] * sinDelta * cosDelta
-                   + M2 * G * np.sin(state[2]) * cosDelta
-                   + M2 * L2 * state[3] * state[3] * sinDelta
-                   - (M1 + M2) * G * np.sin(state[0])) / den1
+        dydx1 = (M2 * L1 * omega1 * omega1 * sinDelta * cosDelta
+                 + M2 * G * np.sin(theta2) * cosDelta
+                 + M2 * L2 * omega2 * omega2 * sinDelta
+                 - (M1 + M2) * G * np.sin(theta1)) / den1
 
         den2 = (L2 / L1) * den1
-        dydx[3] = (-M2 * L2 * state[3] * state[3] * sinDelta * cosDelta
-                   + (M1 + M2) * G * np.sin(state[0]) * cosDelta
-                   - (M1 + M2) * L1 * state[1] * state[1] * sinDelta
-                   - (M1 + M2) * G * np.sin(state[2])) / den2
-        
+        dydx3 = (-M2 * L2 * omega2 * omega2 * sinDelta * cosDelta
+                 + (M1 + M2) * G * np.sin(theta1) * cosDelta
+                 - (M1 + M2) * L1 * omega1 * omega1 * sinDelta
+                 - (M1 + M2) * G * np.sin(theta2)) / den2
+
+        dydx[..., 0] = omega1
+        dydx[..., 1] = dydx1
+        dydx[..., 2] = omega2
+        dydx[..., 3] = dydx3
         return dydx
 
+    def Jacobian(self, state, t):
+        '''closed-form Jacobian d(DstateDt)/d(state), usable as odeint's Dfun'''
+        (L1, L2, M1, M2, G) = self.params
+        # DstateDt is the same system as Polar in DoublePendulum1.py
+        return PolarJacobianBatch(np.asarray(state), L1, L2, M1, M2, G)
+
+    def Solve(self, t, method='LSODA', rtol=1e-8, atol=1e-10, jac=True):
+        '''
+        integrate from the current state over the times t with solve_ivp and
+        return its result. For the implicit methods ('BDF', 'Radau') and for
+        LSODA the closed-form Jacobian is passed unless jac is False.
+        '''
+        kwargs = {}
+        if jac and method in ('BDF', 'Radau', 'LSODA'):
+            kwargs['jac'] = lambda t, y: self.Jacobian(y, t)
+        # solve_ivp's nfev leaves out the calls made for finite difference
+        # Jacobians, so count every derivative evaluation here as nrhs
+        nrhs = [0]
+        def fun(t, y):
+            nrhs[0] += 1
+            return self.DstateDt(y, t)
+        sol = integrate.solve_ivp(fun, (t[0], t[-1]), self.state, method=method,
+                                  t_eval=t, rtol=rtol, atol=atol, **kwargs)
+        sol.nrhs = nrhs[0]
+        return sol
+
+    def SolverStats(self, t, methods=('BDF', 'Radau')):
+        '''
+        total RHS evaluations (nrhs), Jacobian evaluations (njev) and LU
+        decompositions (nlu) of each method, with and without the closed-form
+        Jacobian. solve_ivp reports njev = 0 for LSODA either way, so for it
+        only nrhs tells the two runs apart
+        '''
+        stats = {}
+        for method in methods:
+            for jac in (False, True):
+                sol = self.Solve(t, method=method, jac=jac)
+                stats[(method, jac)] = (sol.nrhs, sol.njev, sol.nlu)
+        return stats
+
     def Step(self, dt):
         '''execute one time step of length dt and update state'''
-        self.state = integrate.odeint(self.DstateDt, self.state, [0, dt])[1]
+        if self.method == 'odeint':
+            self.state = integrate.odeint(self.DstateDt, self.state, [0, dt])[1]
+        else:
+            self.stepper.Step(self.state, dt)
         self.timeElapsed += dt
 
 #------------------------------------------------------------
+
+class Stepper:
+    '''
+    Persistent integrator with preallocated work buffers, for stepping one
+    or many pendulums (state of shape (4,) or (..., 4)) in place.
+
+    rhs(state, out) writes the time derivative of state into out.
+    method is one of
+        'rk4'      classic fixed step Runge-Kutta
+        'dopri5'   adaptive Dormand-Prince 5(4), the accepted step size and
+                   the FSAL derivative are kept between calls
+        'midpoint' implicit midpoint rule applied in the canonical
+                   (theta, p) coordinates, which makes it symplectic;
+                   needs params = (L1, L2, M1, M2, G). When its fixed point
+                   iteration does not converge to tol (relative to |theta|)
+                   within maxIter passes, the step is retried as two halves,
+                   up to maxHalvings times, before a RuntimeError is raised
+    '''
+    def __init__(self, rhs, state, method='rk4', rtol=1e-6, atol=1e-9,
+                 params=None, maxIter=20, tol=1e-13, maxHalvings=8):
+        if method not in ('rk4', 'dopri5', 'midpoint'):
+            raise ValueError('unknown method {0}'.format(method))
+        if method == 'midpoint' and params is None:
+            raise ValueError("method 'midpoint' needs params=(L1, L2, M1, M2, G)")
+        self.rhs = rhs
+        self.method = method
+        self.params = params
+        self.maxIter = maxIter
+        self.tol = tol
+        self.maxHalvings = maxHalvings
+        if method != 'midpoint':
+            # the explicit schemes run on the shared tableau integrator, which
+            # keeps its stage buffers, step size and FSAL derivative between calls
+            self.rk = RungeKutta(lambda t, y, out: rhs(y, out), method, rtol, atol)
+
+    def Step(self, state, dt):
+        '''advance state by dt in place and return it'''
+        if self.method == 'rk4':
+            self.rk.Step(0., state, dt)
+        elif self.method == 'dopri5':
+            self.rk.Advance(0., state, dt)
+        else:
+            self.Midpoint(state, dt)
+        return state
+
+    def MassMatrix(self, theta1, theta2):
+        (L1, L2, M1, M2, G) = self.params
+        m12 = M2 * L1 * L2 * np.cos(theta1 - theta2)
+        return (M1 + M2) * L1 * L1, m12, M2 * L2 * L2
+
+    def Midpoint(self, y, h, halvings=0):
+        '''implicit midpoint in (theta1, p1, theta2, p2), solved by fixed point iteration'''
+        (L1, L2, M1, M2, G) = self.params
+        # canonical momenta of the current state
+        a, b, c = self.MassMatrix(y[..., 0], y[..., 2])
+        p1 = a * y[..., 1] + b * y[..., 3]
+        p2 = b * y[..., 1] + c * y[..., 3]
+        theta1New, theta2New, p1New, p2New = y[..., 0], y[..., 2], p1, p2
+        # the angles grow without bound for rotating arms, so the tolerance grows with them
+        tolerance = self.tol * (1 + np.abs(y[..., 0]) + np.abs(y[..., 2]))
+        converged = False
+        for _ in range(self.maxIter):
+            theta1 = 0.5 * (y[..., 0] + theta1New)
+            theta2 = 0.5 * (y[..., 2] + theta2New)
+            p1m = 0.5 * (p1 + p1New)
+            p2m = 0.5 * (p2 + p2New)
+            a, b, c = self.MassMatrix(theta1, theta2)
+            det = a * c - b * b
+            omega1 = (c * p1m - b * p2m) / det
+            omega2 = (a * p2m - b * p1m) / det
+            coupling = M2 * L1 * L2 * omega1 * omega2 * np.sin(theta1 - theta2)
+            dp1 = -coupling - (M1 + M2) * G * L1 * np.sin(theta1)
+            dp2 = coupling - M2 * G * L2 * np.sin(theta2)
+            change = (np.abs(y[..., 0] + h * omega1 - theta1New)
+                      + np.abs(y[..., 2] + h * omega2 - theta2New))
+            theta1New = y[..., 0] + h * omega1
+            theta2New = y[..., 2] + h * omega2
+            p1New = p1 + h * dp1
+            p2New = p2 + h * dp2
+            converged = np.all(change <= tolerance)
+            if converged:
+                break
+        if not converged:
+            # an unconverged iterate is neither symplectic nor consistent
+            if halvings == self.maxHalvings:
+                raise RuntimeError('implicit midpoint did not converge in {0} iterations '
+                                   'with step {1}'.format(self.maxIter, h))
+            self.Midpoint(y, 0.5 * h, halvings + 1)
+            self.Midpoint(y, 0.5 * h, halvings + 1)
+            return
+        a, b, c = self.MassMatrix(theta1New, theta2New)
+        det = a * c - b * b
+        y[..., 0] = theta1New
+        y[..., 1] = (c * p1New - b * p2New) / det
+        y[..., 2] = theta2New
+        y[..., 3] = (a * p2New - b * p1New) / det
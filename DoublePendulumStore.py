@@ -0,0 +1,119 @@
+# Chunked, resumable double pendulum runs
+# Long runs are integrated one time window at a time. Each window is written to its own
+# chunk file in a store directory, followed by a checkpoint with the integrator state.
+# A killed run continues from the last complete window, and nothing longer than one
+# window is held in memory. Reading goes chunk by chunk as well, with the Cartesian
+# conversion applied lazily to each chunk.
+import os
+import numpy as np
+from numpy import pi
+from scipy.integrate import odeint
+
+from DoublePendulum1 import Cartesian, Polar, PolarJacobian
+from DoublePendulumEnsemble import g
+
+def _AtomicSave(filename, save):
+    '''write through a temporary file so a crash never leaves half a file behind'''
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        save(f)
+    os.replace(tmp, filename)
+
+class TrajectoryStore:
+    '''
+    Directory of trajectory chunks. Chunk i holds the times t and states z of one
+    window, as chunk_#####.npz when compressed and as a pair of .npy files otherwise,
+    which can be opened with memmap. checkpoint.npz holds the state to resume from.
+    '''
+    def __init__(self, path, compress=False):
+        self.path = path
+        self.compress = compress
+        os.makedirs(path, exist_ok=True)
+
+    def ChunkName(self, i, suffix):
+        return os.path.join(self.path, 'chunk_{0:05d}{1}'.format(i, suffix))
+
+    def Append(self, i, t, z):
+        '''write window i, replacing any partial copy left by an interrupted run'''
+        if self.compress:
+            _AtomicSave(self.ChunkName(i, '.npz'), lambda f: np.savez_compressed(f, t=t, z=z))
+        else:
+            _AtomicSave(self.ChunkName(i, '_t.npy'), lambda f: np.save(f, t))
+            _AtomicSave(self.ChunkName(i, '_z.npy'), lambda f: np.save(f, z))
+
+    def SaveCheckpoint(self, nChunks, step, z, params):
+        _AtomicSave(os.path.join(self.path, 'checkpoint.npz'),
+                    lambda f: np.savez(f, nChunks=nChunks, step=step, z=z, params=params))
+
+    def LoadCheckpoint(self):
+        '''(nChunks, step, z, params) after the last complete window, or None for a new store'''
+        filename = os.path.join(self.path, 'checkpoint.npz')
+        if not os.path.exists(filename):
+            return None
+        with np.load(filename) as data:
+            return int(data['nChunks']), int(data['step']), data['z'], data['params']
+
+    def __len__(self):
+        checkpoint = self.LoadCheckpoint()
+        return 0 if checkpoint is None else checkpoint[0]
+
+    def Chunk(self, i):
+        '''times and states of chunk i, memory mapped when stored uncompressed'''
+        if self.compress:
+            with np.load(self.ChunkName(i, '.npz')) as data:
+                return data['t'], data['z']
+        return (np.load(self.ChunkName(i, '_t.npy'), mmap_mode='r'),
+                np.load(self.ChunkName(i, '_z.npy'), mmap_mode='r'))
+
+    def Chunks(self):
+        for i in range(len(self)):
+            yield self.Chunk(i)
+
+    def CartesianChunks(self, L1, L2):
+        '''
+        yield (t, xy) per chunk, xy the (n, 8) array of x1, y1, x2, y2, vx1, vy1, vx2,
+        vy2 from Cartesian of DoublePendulum1.py
+        '''
+        for t, z in self.Chunks():
+            yield t, np.stack(Cartesian(z[:, 0], z[:, 1], z[:, 2], z[:, 3], L1, L2), axis=-1)
+
+    def Load(self):
+        '''the whole trajectory in memory, only for runs that fit'''
+        chunks = list(self.Chunks())
+        return (np.concatenate([t for t, z in chunks]),
+                np.concatenate([z for t, z in chunks]))
+
+def StreamRun(path, z0, tstop, dt, window=10000, L1=1., L2=2., m1=3., m2=1., g=g,
+              compress=False):
+    '''
+    Integrate z0 up to tstop with output step dt into the store at path, window steps
+    per chunk. If the store already has a checkpoint the run resumes from it, and z0
+    is ignored, so a finished run can also be extended to a later tstop.
+    Returns the TrajectoryStore.
+    '''
+    store = TrajectoryStore(path, compress)
+    params = np.array([L1, L2, m1, m2, g, dt, window])
+    checkpoint = store.LoadCheckpoint()
+    if checkpoint is None:
+        i, step, z = 0, 0, np.asarray(z0, dtype='float')
+    else:
+        i, step, z, saved = checkpoint
+        if not np.allclose(saved, params):
+            raise ValueError('store {0} was written with different parameters'.format(path))
+    nSteps = int(round(tstop/dt))
+    while step < nSteps:
+        # window + 1 times, the last one only supplies the state for the next window
+        k = np.arange(step, min(step + window, nSteps) + 1)
+        t = k*dt
+        zw = odeint(Polar, z, t, args=(L1, L2, m1, m2, g), Dfun=PolarJacobian)
+        store.Append(i, t[:-1], zw[:-1])
+        i += 1
+        step = k[-1]
+        z = zw[-1]
+        store.SaveCheckpoint(i, step, z, params)
+    return store
+
+if __name__ == "__main__":
+    store = StreamRun('DoublePendulumRun', [pi/2, 0, pi/2, 0], tstop=1000, dt=0.001)
+    for t, xy in store.CartesianChunks(1., 2.):
+        print('t = {0:.1f} .. {1:.1f}, max |x2| = {2:.3f}'.format(t[0], t[-1], np.max(np.abs(xy[:, 2]))))
@@ -2,6 +2,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 import time
 
+from QuantumWalkEngine import Probabilities
+
 def QuantumWalk(N, theta, phi):
     P = 2*N+1
     
@@ -36,33 +38,33 @@ def QuantumWalk(N, theta, phi):
     # do N steps of walking
     psiN = np.dot(np.linalg.matrix_power(U,N),psi0)
 
-    # measurements
-    probs = np.empty(P)
-    for k in range(P):
-        posn = np.zeros(P)
-        posn[k] = 1
-        M_hat_k = np.kron( np.outer(posn,posn), np.eye(2))
-        proj =   np.dot(M_hat_k,psiN)
-        probs[k] = proj.dot(proj.conjugate()).real
+    # measurements, straight from the amplitudes psiN[2*x + c]
+    probs = Probabilities(psiN.reshape(P, 2))
 
     return probs
-    
-
-    
 
-theta = 45
-phi = 45
-Etime = []
-for i in range(1,100):
-    N = i
-    start = time.time()
-    _ = QuantumWalk(N, theta, phi)
-    Etime.append(time.time()-start)
+if __name__ == "__main__":
+    from QuantumWalkEngine import QuantumWalk as MatrixFreeWalk
 
-plt.plot(Etime)
-plt.title('How long does it take to run a QW program?')
-plt.xlabel('N')
-plt.ylabel('Time of execution')
-print('Total Execution time' ,time.time() - start, 'seconds')
-plt.show()
+    theta = 45
+    phi = 45
+    Etime = []
+    Ftime = []
+    begin = time.time()
+    for i in range(1,100):
+        N = i
+        start = time.time()
+        _ = QuantumWalk(N, theta, phi)
+        Etime.append(time.time()-start)
+        start = time.time()
+        _ = MatrixFreeWalk(N, theta, phi)
+        Ftime.append(time.time()-start)
 
+    plt.plot(Etime, label='dense matrix_power')
+    plt.plot(Ftime, label='matrix-free (QuantumWalkEngine)')
+    plt.legend()
+    plt.title('How long does it take to run a QW program?')
+    plt.xlabel('N')
+    plt.ylabel('Time of execution')
+    print('Total Execution time' ,time.time() - begin, 'seconds')
+    plt.show()
@@ -4,59 +4,30 @@ import numpy as np
 import matplotlib.pyplot as plt
 import time
 
+from HarperPhaseSpace import ScriptGrid, PhaseSpaceStream
+from PhaseSpaceDensity import DensityImage
+
 # define basic change parameters
 dt = 0.1
-dx = 0.
-dy = 0.
 
-# Preallocate variables for speed
 t = len(np.arange(0,100,dt)) # For what value of t should I find x(t) and y(t) ?
-q = np.zeros(t) # Values of q(t)
-p = np.zeros(t) # Values of p(t)
-
-# Function to implement RK(4) method
-def Rk4Method(flag, val):
-    # We know that the function f(x) = flag*sin(val)
-    f1 = dt*flag*np.sin(val)
-    f2 = dt*flag*np.sin(val + (f1*0.5))
-    f3 = dt*flag*np.sin(val + (f2*0.5))
-    f4 = dt*flag*np.sin(val + f3)
-    # Keep in mind that we have to return dx or dy!
-    res = (f1 + 2*f2 + 2*f3 + f4)/6
-    return res 
 
+# All 1600 initial conditions are integrated together as arrays. Use scheme='euler' for
+# the Euler version, or 'rk4' for RK(4) on the coupled system; 'legacy' is the original
+# Rk4Method update that steps q and p separately.
+# Every step is binned straight into an image, each orbit in the colour plt.plot would give it.
 begin = time.time()
-for i in np.arange(-10, 10,0.5):
-    for j in np.arange(-10, 10, 0.5):
-        # Show (i,j) for debugging purposes
-        print('i = {0}, j = {1}. Time elapsed = {2} s.'.format(i,j, (time.time()-begin)), flush = True, end = '\r')
-        q[0] = i*np.pi/2 # Set initial conditions
-        p[0] = (j+0.5)*np.pi/2
-        for k in range(t-1): # Create arrays!
-            dq = np.sin( p[k] )*dt
-            q[k+1] = q[k] + dq
-            dp = -1*np.sin(q[k])*dt
-            p[k+1] = p[k]+dp
-
-        # Now, we can try out the RK(4) method.
-        for k in range(t-1): 
-            dq = Rk4Method(1, p[k])
-            q[k+1] = q[k] + dq
-            dp = Rk4Method(-1, q[k])
-            p[k+1] = p[k]+dp
-        
-        plt.plot(q,p)
-        plt.xlim(-100,100)
-        plt.ylim(-100,100)
+q0, p0 = ScriptGrid()
+colors = [plt.matplotlib.colors.to_rgb(c) for c in plt.rcParams['axes.prop_cycle'].by_key()['color']]
+density = DensityImage((-100, 100), (-100, 100), width=2048, height=2048, colors=colors)
+for q, p in PhaseSpaceStream(q0, p0, t, dt, scheme='legacy'):
+    density.Add(q, p)
+print('Integrated and binned {0} orbits in {1} s.'.format(q0.size, time.time()-begin))
+density.Save('HarperHamiltonianPhaseSpace.png')
 
 # Now that all the plotting is done, show!
+plt.imshow(density.Image(), extent=(-100, 100, -100, 100))
 plt.title('Phase space plot of Harper Hamiltonian')
 plt.xlabel('Position (q)')
 plt.ylabel('Momentum (p)')
-#plt.savefig('HarperHamiltonianPhaseSpace.png', format='png', dpi=3200)
 plt.show()
-
-
-
-
-
@@ -0,0 +1,92 @@
+# Harper Hamiltonian phase space engine
+# H = l cos p + k cos q, so dq/dt = -l sin p and dp/dt = k sin q. The defaults l = k = -1
+# give dq/dt = sin p, dp/dt = -sin q, as in HarperHamiltonianWithRK-4.py.
+# All initial conditions of a (q0, p0) grid are stepped together as arrays, and the
+# result is either the whole (steps, Nq, Np, 2) history or a stream of (q, p) per step.
+import numpy as np
+from numpy import pi
+import time
+
+from Integrators import RungeKutta
+
+def ScriptGrid():
+    '''the 40 x 40 initial conditions of HarperHamiltonianWithRK-4.py as (q0, p0) arrays'''
+    i = np.arange(-10, 10, 0.5)
+    j = np.arange(-10, 10, 0.5)
+    q0, p0 = np.meshgrid(i*pi/2, (j + 0.5)*pi/2, indexing='ij')
+    return q0, p0
+
+def Rk4Method(flag, val, dt):
+    '''array version of Rk4Method in HarperHamiltonianWithRK-4.py, the RK4 increment of x' = flag*sin(x)'''
+    f1 = dt*flag*np.sin(val)
+    f2 = dt*flag*np.sin(val + (f1*0.5))
+    f3 = dt*flag*np.sin(val + (f2*0.5))
+    f4 = dt*flag*np.sin(val + f3)
+    return (f1 + 2*f2 + 2*f3 + f4)/6
+
+def Derivatives(q, p, l, k):
+    return -l*np.sin(p), k*np.sin(q)
+
+def Stepper(l=-1., k=-1.):
+    '''RK4 stepper of the shared integrator for states stacked as [q, p] on the first axis'''
+    def rhs(t, y, out):
+        np.sin(y[1], out=out[0])
+        out[0] *= -l
+        np.sin(y[0], out=out[1])
+        out[1] *= k
+        return out
+    return RungeKutta(rhs, 'rk4')
+
+def Step(q, p, dt, scheme='rk4', l=-1., k=-1.):
+    '''
+    one step of every orbit, returns the new (q, p). Schemes:
+        'euler'   explicit Euler, the first loop of the script
+        'rk4'     classic RK4 on the coupled (q, p) system
+        'legacy'  the script's Rk4Method update, which steps q and p separately
+                  (kept to reproduce the original figure)
+    '''
+    if scheme == 'euler':
+        dq, dp = Derivatives(q, p, l, k)
+        return q + dq*dt, p + dp*dt
+    if scheme == 'legacy':
+        return q + Rk4Method(-l, p, dt), p + Rk4Method(k, q, dt)
+    if scheme == 'rk4':
+        y = np.array(np.broadcast_arrays(q, p), dtype='float')
+        Stepper(l, k).Step(0., y, dt)
+        return y[0], y[1]
+    raise ValueError('unknown scheme {0}'.format(scheme))
+
+def PhaseSpaceStream(q0, p0, steps, dt=0.1, scheme='rk4', l=-1., k=-1.):
+    '''yield (q, p) arrays for the initial conditions and each of the following steps - 1 steps'''
+    q = np.array(q0, dtype='float')
+    p = np.array(p0, dtype='float')
+    yield q, p
+    if scheme == 'rk4':
+        # one stepper for the whole run, so its stage buffers are only allocated once
+        rk = Stepper(l, k)
+        y = np.array(np.broadcast_arrays(q, p))
+        for _ in range(steps - 1):
+            y = rk.Step(0., y.copy(), dt)
+            yield y[0], y[1]
+        return
+    for _ in range(steps - 1):
+        q, p = Step(q, p, dt, scheme, l, k)
+        yield q, p
+
+def PhaseSpace(q0, p0, steps, dt=0.1, scheme='rk4', l=-1., k=-1.):
+    '''(steps,) + q0.shape + (2,) array of every orbit, [..., 0] is q and [..., 1] is p'''
+    q0 = np.asarray(q0, dtype='float')
+    out = np.empty((steps,) + q0.shape + (2,))
+    for n, (q, p) in enumerate(PhaseSpaceStream(q0, p0, steps, dt, scheme, l, k)):
+        out[n, ..., 0] = q
+        out[n, ..., 1] = p
+    return out
+
+if __name__ == "__main__":
+    dt = 0.1
+    steps = len(np.arange(0, 100, dt))
+    q0, p0 = ScriptGrid()
+    for scheme in ('euler', 'rk4', 'legacy'):
+        begin = time.time()
+        orbits = PhaseSpace(q0, p0, steps, dt, scheme)
+        print('{0}: {1} orbits of {2} steps in {3:.3f} s.'.format(scheme, q0.size, steps, time.time() - begin))
@@ -0,0 +1,254 @@
+# Explicit Runge-Kutta integrators from Butcher tableaus
+# One implementation for every model in this repository. The state may be a NumPy array
+# of any batch shape, the stage buffers are allocated once per shape and reused, and
+# embedded pairs (Dormand-Prince 5(4), Bogacki-Shampine 3(2)) adapt the step size and
+# provide dense output between steps.
+#
+# The right hand side is called as rhs(t, y, out) and writes dy/dt into out. FromOdeint
+# and FromIvp adapt the odeint style f(y, t, *args) models (Polar, DstateDt, Equation of
+# simplePendulumRaw.py) and the solve_ivp style f(t, y, *args) ones (Equation of
+# Pendulum Simulation.py).
+import numpy as np
+
+class Tableau:
+    '''
+    Butcher tableau: stage matrix A, weights b, nodes c. bErr holds b - bhat of an
+    embedded pair (None for fixed step methods), fsal is True when the last stage is
+    evaluated at the new solution, and dense holds Dormand-Prince style dense output
+    weights when available.
+    '''
+    def __init__(self, A, b, c, order, bErr=None, fsal=False, dense=None):
+        self.A = [np.asarray(row, dtype='float') for row in A]
+        self.b = np.asarray(b, dtype='float')
+        self.c = np.asarray(c, dtype='float')
+        self.order = order
+        self.bErr = None if bErr is None else np.asarray(bErr, dtype='float')
+        self.fsal = fsal
+        self.dense = None if dense is None else np.asarray(dense, dtype='float')
+
+    @property
+    def stages(self):
+        return len(self.b)
+
+TABLEAUS = {
+    'euler': Tableau([[]], [1.], [0.], 1),
+    'midpoint': Tableau([[], [1/2]], [0., 1.], [0., 1/2], 2),
+    'heun': Tableau([[], [1.]], [1/2, 1/2], [0., 1.], 2),
+    'rk4': Tableau([[], [1/2], [0., 1/2], [0., 0., 1.]],
+                   [1/6, 1/3, 1/3, 1/6], [0., 1/2, 1/2, 1.], 4),
+    'rk38': Tableau([[], [1/3], [-1/3, 1.], [1., -1., 1.]],
+                    [1/8, 3/8, 3/8, 1/8], [0., 1/3, 2/3, 1.], 4),
+    'bs32': Tableau([[], [1/2], [0., 3/4], [2/9, 1/3, 4/9]],
+                    [2/9, 1/3, 4/9, 0.], [0., 1/2, 3/4, 1.], 3,
+                    bErr=[2/9 - 7/24, 1/3 - 1/4, 4/9 - 1/3, -1/8], fsal=True),
+    'dopri5': Tableau([[],
+                       [1/5],
+                       [3/40, 9/40],
+                       [44/45, -56/15, 32/9],
+                       [19372/6561, -25360/2187, 64448/6561, -212/729],
+                       [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+                       [35/384, 0., 500/1113, 125/192, -2187/6784, 11/84]],
+                      [35/384, 0., 500/1113, 125/192, -2187/6784, 11/84, 0.],
+                      [0., 1/5, 3/10, 4/5, 8/9, 1., 1.], 5,
+                      bErr=[71/57600, 0., -71/16695, 71/1920, -17253/339200, 22/525, -1/40],
+                      fsal=True,
+                      dense=[-12715105075/11282082432, 0., 87487479700/32700410799,
+                             -10690763975/1880347072, 701980252875/199316789632,
+                             -1453857185/822651844, 69997945/29380423]),
+}
+
+def FromOdeint(f, *args):
+    '''rhs(t, y, out) for an odeint style model f(y, t, *args)'''
+    def rhs(t, y, out):
+        out[...] = np.asarray(f(y, t, *args))
+        return out
+    return rhs
+
+def FromIvp(f, *args):
+    '''rhs(t, y, out) for a solve_ivp style model f(t, y, *args)'''
+    def rhs(t, y, out):
+        out[...] = np.asarray(f(t, y, *args))
+        return out
+    return rhs
+
+def Hermite(s, y0, y1, f0, f1, h):
+    '''cubic Hermite interpolant between y0 and y1 (derivatives f0, f1) at fraction s of a step h'''
+    s = s[..., None] if 0 < np.ndim(s) < np.ndim(y0) else s
+    s2, s3 = s*s, s*s*s
+    return ((2*s3 - 3*s2 + 1)*y0 + (s3 - 2*s2 + s)*h*f0
+            + (-2*s3 + 3*s2)*y1 + (s3 - s2)*h*f1)
+
+def HermiteRoot(x0, x1, v0, v1, h, iterations=4):
+    '''
+    fraction s in [0, 1] where the cubic Hermite interpolant through x0, x1 with
+    derivatives v0, v1 vanishes, by Newton iterations from the linear guess
+    '''
+    s = x0/(x0 - x1)
+    for _ in range(iterations):
+        s2 = s*s
+        p = Hermite(s, x0, x1, v0, v1, h)
+        dp = (6*s2 - 6*s)*(x0 - x1) + (3*s2 - 4*s + 1)*h*v0 + (3*s2 - 2*s)*h*v1
+        s = np.clip(s - p/np.where(dp == 0, 1., dp), 0., 1.)
+    return s
+
+class RungeKutta:
+    '''
+    Explicit Runge-Kutta stepper for one tableau. The state y is owned by the caller
+    and updated in place; the stepper only keeps its work buffers, the adaptive step
+    size and (for FSAL pairs) the derivative at the end of the last step.
+    '''
+    def __init__(self, rhs, tableau='rk4', rtol=1e-6, atol=1e-9, h=None):
+        self.rhs = rhs
+        self.tableau = TABLEAUS[tableau] if isinstance(tableau, str) else tableau
+        self.rtol, self.atol = rtol, atol
+        self.h = h
+        self.shape = None
+        self.yLast = None
+        self.nfev = 0
+
+    def Buffers(self, y):
+        '''(re)allocate the stage buffers when the state shape changes'''
+        if y.shape != self.shape:
+            self.shape = y.shape
+            self.k = np.empty((self.tableau.stages,) + y.shape)
+            self.tmp = np.empty(y.shape)
+            self.err = np.empty(y.shape)
+            self.y0 = np.empty(y.shape)
+            self.yLast = None
+
+    def Stages(self, t, y, h, first=True):
+        '''fill k with the stage derivatives, and tmp with the new solution'''
+        tab, k, tmp = self.tableau, self.k, self.tmp
+        if first:
+            self.rhs(t, y, k[0])
+            self.nfev += 1
+        for s in range(1, tab.stages):
+            np.copyto(tmp, y)
+            for j, a in enumerate(tab.A[s]):
+                if a:
+                    tmp += (h*a)*k[j]
+            self.rhs(t + tab.c[s]*h, tmp, k[s])
+            self.nfev += 1
+        if tab.fsal:
+            # the last stage was evaluated at the new solution, which is now in tmp
+            return tmp
+        np.copyto(tmp, y)
+        for j, bj in enumerate(tab.b):
+            if bj:
+                tmp += (h*bj)*k[j]
+        return tmp
+
+    def Step(self, t, y, h):
+        '''one fixed step of length h, y is updated in place'''
+        self.Buffers(y)
+        y[...] = self.Stages(t, y, h)
+        return y
+
+    def ErrorNorm(self, y, yNew, h):
+        err = self.err
+        err.fill(0.)
+        for j, e in enumerate(self.tableau.bErr):
+            if e:
+                err += (h*e)*self.k[j]
+        scale = self.atol + self.rtol*np.maximum(np.abs(y), np.abs(yNew))
+        return np.sqrt(np.mean((err/scale)**2))
+
+    def Advance(self, t, y, dt, dense=None):
+        '''
+        integrate from t to t + dt in place, with adaptive steps for embedded pairs
+        (the step size carries over to the next call) and fixed steps of at most h
+        otherwise. dense, if given, is called as dense(t0, h, interpolant) after every
+        accepted step, where interpolant(theta) is the state at t0 + theta*h.
+        '''
+        self.Buffers(y)
+        tab, k = self.tableau, self.k
+        if self.h is None:
+            self.h = dt
+        if tab.bErr is None:
+            n = max(1, int(np.ceil(abs(dt)/abs(self.h) - 1e-12)))
+            h = dt/n
+            for i in range(n):
+                np.copyto(self.y0, y)
+                self.Step(t + i*h, y, h)
+                if dense is not None:
+                    dense(t + i*h, h, self.Interpolant(t + (i + 1)*h, h, y))
+            return y
+        # reuse the FSAL derivative if y is still the state we finished with
+        first = not (tab.fsal and self.yLast is not None and np.array_equal(self.yLast, y))
+        end = t + dt
+        exponent = -1/tab.order
+        while (end - t)*np.sign(dt) > 0:
+            h = min(abs(self.h), abs(end - t))*np.sign(dt)
+            yNew = self.Stages(t, y, h, first)
+            errNorm = self.ErrorNorm(y, yNew, h)
+            factor = min(5., max(0.2, 0.9*errNorm**exponent if errNorm > 0 else 5.))
+            if errNorm <= 1.:
+                np.copyto(self.y0, y)
+                y[...] = yNew
+                if dense is not None:
+                    dense(t, h, self.Interpolant(t + h, h, y))
+                t += h
+                # summed steps miss the end by rounding, which would leave a step of 1e-16
+                if abs(end - t) <= 4*np.spacing(max(abs(end), abs(t))):
+                    t = end
+                if tab.fsal:
+                    k[0][...] = k[-1]
+                    first = False
+                else:
+                    first = True
+                # a step clipped to land on the end says nothing about the next one
+                if abs(h) == abs(self.h):
+                    self.h = h*factor
+            else:
+                # k[0] still holds the derivative at y
+                self.h = h*factor
+                first = False
+        if tab.fsal:
+            self.yLast = y.copy()
+        return y
+
+    def Interpolant(self, t1, h, y1):
+        '''
+        dense output over the last step from self.y0 to y1 at time t1: Dormand-Prince
+        continuous extension when the tableau has one, else cubic Hermite
+        '''
+        tab, k = self.tableau, self.k
+        y0 = self.y0.copy()
+        y1 = y1.copy()
+        ydiff = y1 - y0
+        if tab.dense is not None:
+            # k[-1] is still the derivative at y1 here
+            bspl = h*k[0] - ydiff
+            r4 = ydiff - h*k[-1] - bspl
+            r5 = h*np.tensordot(tab.dense, k, axes=1)
+            def interpolant(theta):
+                return y0 + theta*(ydiff + (1 - theta)*(bspl + theta*(r4 + (1 - theta)*r5)))
+            return interpolant
+        f0 = k[0].copy()
+        f1 = np.empty_like(y1)
+        self.rhs(t1, y1, f1)
+        self.nfev += 1
+        return lambda theta: Hermite(theta, y0, y1, f0, f1, h)
+
+    def Integrate(self, y0, t, dense=True):
+        '''
+        odeint-like solve: the state at every time in t, returned as (len(t),) + y0.shape.
+        With dense output the steps are chosen by the error control alone and the
+        output times are interpolated; otherwise the integration stops at every t[i].
+        '''
+        t = np.asarray(t, dtype='float')
+        y = np.array(y0, dtype='float')
+        out = np.empty((len(t),) + y.shape)
+        out[0] = y
+        if not dense or self.tableau.dense is None:
+            for i in range(1, len(t)):
+                out[i] = self.Advance(t[i-1], y, t[i] - t[i-1])
+            return out
+        index = [1]
+        def record(t0, h, interpolant):
+            while index[0] < len(t) and (t[index[0]] - (t0 + h))*np.sign(h) <= 0:
+                out[index[0]] = interpolant((t[index[0]] - t0)/h)
+                index[0] += 1
+        self.Advance(t[0], y, t[-1] - t[0], dense=record)
+        out[-1] = y
+        return out
@@ -1,5 +1,5 @@
 # Julia Fractal
-from PIL import Image 
+from JuliaEngine import JuliaImage
 # driver function 
 if __name__ == "__main__": 
 	
@@ -7,26 +7,16 @@ if __name__ == "__main__":
 	
 	w, h, zoom = 1920,1080,1
 
-	# creating the image in RGB mode 
-	bitmap = Image.new("RGB", (w, h), "white") 
-
-	pix = bitmap.load() 
-	
 	# the equation to create the fractal 
 	cX, cY = -0.7, 0.3  # Just mess around and get messy images. Though this particular value makes it look beau.
 	dX, dY = 0.0, 0.0
 	maxIter = 255
+	# only iterate the borders of rectangles and fill the uniform ones: the same image,
+	# much faster for values of c whose set has a large inside (try -0.12, 0.75)
+	subdivide = False
 
-	for x in range(w): 
-		for y in range(h): 
-			zx = 1.5*(x - w/2)/(0.5*zoom*w) + dX 
-			zy = 1.0*(y - h/2)/(0.5*zoom*h) + dY 
-			i = maxIter 
-			while zx*zx + zy*zy < 4 and i > 1: 
-				tmp = zx*zx - zy*zy + cX 
-				zy,zx = 2.0*zx*zy + cY, tmp 
-				i -= 1
-				pix[x,y] = (i << 21) + (i << 10) + i*8
+	# iteration counts of all pixels at once, turned into the RGB image in one go
+	bitmap = JuliaImage(w, h, zoom, cX, cY, dX, dY, maxIter, subdivide)
 
 	# to display the created fractal 
 	bitmap.show() 
@@ -0,0 +1,148 @@
+# Tiled multi-process Julia renders
+# For print sized images (16k pixels wide and more) the image is split into tiles, and a
+# process pool takes them one at a time, so workers that get cheap tiles outside the set
+# simply take more of them. Every worker writes its tiles straight into one
+# memory-mapped file of iteration counts, one byte per pixel for up to 256 iterations,
+# and no process ever holds a full image. The PNG is then written a band of rows at a
+# time from the counts file, with the colours of "Julia Fractal.py" as its palette.
+import numpy as np
+import multiprocessing
+import os
+import struct
+import tempfile
+import time
+import zlib
+
+from JuliaEngine import Coordinates, CountType, EscapeCounts, Palette
+
+def Tiles(w, h, tile=512):
+    '''
+    (r0, r1, c0, c1) row and column ranges of the tiles covering an h x w image, the
+    ones nearest the centre first: the set usually sits there and those tiles take the
+    longest, so starting them first keeps the pool from waiting on them at the end
+    '''
+    tiles = [(r, min(r + tile, h), c, min(c + tile, w))
+             for r in range(0, h, tile) for c in range(0, w, tile)]
+    tiles.sort(key=lambda t: (t[0] + t[1] - h)**2 + (t[2] + t[3] - w)**2)
+    return tiles
+
+def _InitWorker(filename, shape, dtype, x, y, cX, cY, maxIter):
+    global _counts, _params
+    _counts = np.memmap(filename, dtype=dtype, mode='r+', shape=shape)
+    _params = (x, y, cX, cY, maxIter)
+
+def _RenderTile(tile):
+    r0, r1, c0, c1 = tile
+    x, y, cX, cY, maxIter = _params
+    _counts[r0:r1, c0:c1] = EscapeCounts(x[None, c0:c1], y[r0:r1, None], cX, cY, maxIter)
+    return tile
+
+def RenderCounts(w, h, filename, zoom=1, cX=-0.7, cY=0.3, dX=0., dY=0., maxIter=255,
+                 tile=512, processes=None, verbose=False):
+    '''
+    iteration counts of the h x w image (see JuliaEngine.EscapeCounts) rendered into
+    the memory-mapped file filename, which is returned as an (h, w) memmap
+    '''
+    processes = processes or multiprocessing.cpu_count()
+    x, y = Coordinates(w, h, zoom, dX, dY)
+    dtype = CountType(maxIter)
+    counts = np.memmap(filename, dtype=dtype, mode='w+', shape=(h, w))
+    counts.flush()
+    args = (filename, (h, w), dtype, x, y, cX, cY, maxIter)
+    tiles = Tiles(w, h, tile)
+    begin = time.time()
+
+    def Wait(done):
+        for k, _ in enumerate(done):
+            if verbose and (k + 1) % max(1, len(tiles)//20) == 0:
+                print('{0}/{1} tiles, {2:.1f} s'.format(k + 1, len(tiles), time.time() - begin))
+
+    if processes == 1:
+        _InitWorker(*args)
+        Wait(map(_RenderTile, tiles))
+    else:
+        # the pool goes away with its workers and their maps of the counts file even
+        # when a tile fails. chunksize 1: a worker asks for the next tile as soon as
+        # it is free
+        with multiprocessing.Pool(processes, _InitWorker, args) as pool:
+            Wait(pool.imap_unordered(_RenderTile, tiles, 1))
+    return counts
+
+def _Chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+class PngWriter:
+    '''
+    PNG file written a band of rows at a time. With a palette ((n, 3) uint8, n <= 256)
+    the rows are palette indices, otherwise RGB. Only the compressor state is kept
+    between bands, so the image never has to be in memory as a whole.
+    '''
+    def __init__(self, filename, w, h, palette=None, level=6):
+        self.w, self.h = w, h
+        self.palette = palette is not None
+        self.file = open(filename, 'wb')
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self.file.write(_Chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 3 if self.palette else 2, 0, 0, 0)))
+        if self.palette:
+            self.file.write(_Chunk(b'PLTE', np.asarray(palette, dtype=np.uint8).tobytes()))
+        self.compressor = zlib.compressobj(level)
+        self.rows = 0
+
+    def Write(self, band):
+        '''append rows, (n, w) palette indices or (n, w, 3) RGB values'''
+        band = np.asarray(band, dtype=np.uint8).reshape(len(band), -1)
+        rows = np.zeros((len(band), band.shape[1] + 1), dtype=np.uint8)
+        # every row starts with its filter type, 0 for none
+        rows[:, 1:] = band
+        data = self.compressor.compress(rows.tobytes())
+        if data:
+            self.file.write(_Chunk(b'IDAT', data))
+        self.rows += len(band)
+
+    def Close(self):
+        if self.rows != self.h:
+            raise ValueError('{0} rows written to an image of height {1}'.format(self.rows, self.h))
+        self.file.write(_Chunk(b'IDAT', self.compressor.flush()))
+        self.file.write(_Chunk(b'IEND', b''))
+        self.file.close()
+
+def WritePng(counts, filename, maxIter=255, band=256, level=6):
+    '''
+    write the (h, w) iteration counts as a PNG with the colours of the script, band
+    rows at a time: as palette indices up to 256 iterations, as RGB beyond that
+    '''
+    h, w = counts.shape
+    palette = Palette(maxIter)
+    indexed = maxIter <= 256
+    writer = PngWriter(filename, w, h, palette if indexed else None, level)
+    for r in range(0, h, band):
+        rows = np.asarray(counts[r:r + band])
+        writer.Write(rows if indexed else palette[rows])
+    writer.Close()
+
+def RenderPng(w, h, filename='fractalImage.png', zoom=1, cX=-0.7, cY=0.3, dX=0., dY=0.,
+              maxIter=255, tile=512, processes=None, countsFile=None, verbose=False):
+    '''
+    render the h x w image with RenderCounts and write it with WritePng. The counts go
+    to countsFile if given (and are kept), else to a temporary file next to filename
+    '''
+    keep = countsFile is not None
+    if not keep:
+        fd, countsFile = tempfile.mkstemp(suffix='.counts', dir=os.path.dirname(os.path.abspath(filename)))
+        os.close(fd)
+    try:
+        begin = time.time()
+        counts = RenderCounts(w, h, countsFile, zoom, cX, cY, dX, dY, maxIter, tile, processes, verbose)
+        rendered = time.time()
+        WritePng(counts, filename, maxIter)
+        if verbose:
+            print('rendered in {0:.1f} s, written in {1:.1f} s'.format(rendered - begin, time.time() - rendered))
+        del counts
+    finally:
+        if not keep:
+            os.remove(countsFile)
+    return filename
+
+if __name__ == "__main__":
+    # a 16k print of the image of "Julia Fractal.py"
+    RenderPng(15360, 8640, 'fractalImage16k.png', verbose=True)
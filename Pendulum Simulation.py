@@ -4,7 +4,7 @@ import numpy as np
 from scipy.integrate import solve_ivp
 import matplotlib.pyplot as plt
 import time
-import os # to launch imagemagick
+from PIL import Image # to write the gif
 
 # constants
 print('Setting constants')
@@ -58,28 +58,41 @@ diff = N - len(cols)
 cols = cols + [cols[-1]]*diff
 
 # start timing here
-print('Plotting the plots.')
+# One figure for all frames: the axes are drawn once and kept as a background,
+# and each frame only redraws the rod and the bob on top of it (blitting).
+print('Plotting the frames.')
 begin = time.time()
-counter = 0
-for point in points:
-    plt.figure()
-    plt.plot([0,x[point]], [0,y[point]])
-    plt.plot(x[point],y[point],'o',markersize=30,markerfacecolor=cols[counter])
-    plt.xlim(-L-0.2, L+0.2)
-    plt.ylim(-L-0.2, L+0.2)
-    plt.xlabel('X-direction')
-    plt.ylabel('Y-direction')
-    filenumber = point
-    filenumber=format(filenumber, '04')
-    plt.savefig('Plots/Image_{0}.png'.format(filenumber), dpi=100, format='png')
-    plt.close()
-    counter = counter +1
-    print('Done with Plot {0}.'.format(counter))
+fig, ax = plt.subplots()
+ax.set_xlim(-L-0.2, L+0.2)
+ax.set_ylim(-L-0.2, L+0.2)
+ax.set_xlabel('X-direction')
+ax.set_ylabel('Y-direction')
+rod, = ax.plot([], [], animated=True)
+bob, = ax.plot([], [], 'o', markersize=30, animated=True)
+fig.canvas.draw()
+background = fig.canvas.copy_from_bbox(fig.bbox)
+frames = []
+for counter, point in enumerate(points):
+    rod.set_data([0,x[point]], [0,y[point]])
+    bob.set_data([x[point]], [y[point]])
+    bob.set_markerfacecolor(cols[counter])
+    fig.canvas.restore_region(background)
+    ax.draw_artist(rod)
+    ax.draw_artist(bob)
+    # Grab the frame straight from the canvas buffer, as a palette image for the gif.
+    rgb = np.asarray(fig.canvas.buffer_rgba())[:, :, :3]
+    if counter == 0:
+        # One palette for the whole gif: the first frame plus a row of every bob colour.
+        swatch = (np.array(cols)[:, :3]*255).astype(np.uint8)
+        swatch = np.repeat(swatch[:, None, :], rgb.shape[1], axis=1)
+        palette = Image.fromarray(np.concatenate([rgb, swatch])).quantize()
+    frames.append(Image.fromarray(rgb).quantize(palette=palette, dither=Image.NONE))
+plt.close(fig)
 durn = time.time()-begin
-print('Done. This took {0} s.'.format(durn))
-# launch Imagemagick
-print('Launching Imagemagick for conversion.')
+print('Done with {0} frames. This took {1} s.'.format(len(frames), durn))
+# Write the gif in-process, 30 frames per second and looping forever.
+print('Writing the gif.')
 begin=time.time()
-os.system('magick -verbose -limit file 5 -limit memory 40MiB -set delay 1x30 -loop 0 Plots/Image*.png Plots/TestAnim.gif')
+frames[0].save('Plots/TestAnim.gif', save_all=True, append_images=frames[1:], duration=1000//30, loop=0)
 durn = time.time()-begin
 print('All Done. This took {0} s.'.format(durn))
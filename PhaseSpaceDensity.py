@@ -0,0 +1,89 @@
+# Phase space density images
+# Instead of one plt.plot line per orbit, trajectory points are binned into a fixed-size
+# image buffer as soon as they are produced. Memory and render time then depend only on
+# the image size, not on how many orbits or steps there are. Orbits can have their own
+# colours, and the hit counts can be log scaled. The PNG is written directly with PIL.
+import numpy as np
+from PIL import Image
+
+class DensityImage:
+    '''
+    Accumulates (x, y) points into a height x width image covering xlim x ylim.
+    colors, if given, is an (Norbits, 3) array of RGB values in [0, 1]; points then carry
+    the colour of their orbit and every pixel shows the mean colour of its hits.
+    '''
+    def __init__(self, xlim, ylim, width=1024, height=1024, colors=None):
+        self.xlim, self.ylim = xlim, ylim
+        self.width, self.height = width, height
+        self.counts = np.zeros(width*height)
+        self.colors = None if colors is None else np.asarray(colors, dtype='float')
+        if self.colors is not None:
+            self.rgb = np.zeros((3, width*height))
+        # Small batches are queued and binned together, so each full-image bincount
+        # is paid for by at least as many points as the image has pixels.
+        self.pending = []
+        self.pendingColors = []
+        self.nPending = 0
+
+    def Pixels(self, x, y):
+        '''flat pixel index of every point inside the image, and the mask of those points'''
+        x = np.asarray(x, dtype='float').ravel()
+        y = np.asarray(y, dtype='float').ravel()
+        col = np.floor((x - self.xlim[0])/(self.xlim[1] - self.xlim[0])*self.width)
+        # row 0 is the top of the image, i.e. the largest y
+        row = np.floor((self.ylim[1] - y)/(self.ylim[1] - self.ylim[0])*self.height)
+        inside = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+        return (row[inside]*self.width + col[inside]).astype(int), inside
+
+    def Add(self, x, y, orbit=None):
+        '''
+        bin one batch of points. orbit gives each point's orbit index for the colours,
+        by default point n of the batch belongs to orbit n, which fits adding one time
+        step of all orbits at a time
+        '''
+        index, inside = self.Pixels(x, y)
+        self.pending.append(index)
+        if self.colors is not None:
+            if orbit is None:
+                orbit = np.arange(inside.size)
+            self.pendingColors.append(self.colors[np.asarray(orbit).ravel()[inside] % len(self.colors)])
+        self.nPending += index.size
+        if self.nPending >= self.counts.size:
+            self.Flush()
+
+    def Flush(self):
+        '''bin all queued points into the image'''
+        if not self.pending:
+            return
+        n = self.width*self.height
+        index = np.concatenate(self.pending)
+        self.counts += np.bincount(index, minlength=n)
+        if self.colors is not None:
+            c = np.concatenate(self.pendingColors)
+            for k in range(3):
+                self.rgb[k] += np.bincount(index, weights=c[:, k], minlength=n)
+        self.pending, self.pendingColors, self.nPending = [], [], 0
+
+    def Image(self, log=True, floor=0.2):
+        '''
+        (height, width, 3) uint8 image on a white background, every pixel that was
+        hit at all is shown with at least the intensity floor
+        '''
+        self.Flush()
+        counts = self.counts
+        if log:
+            counts = np.log1p(counts)
+        top = counts.max()
+        intensity = counts/top if top > 0 else counts
+        intensity = np.where(self.counts > 0, floor + (1 - floor)*intensity, 0.)
+        if self.colors is None:
+            color = np.zeros((3, counts.size))
+        else:
+            with np.errstate(invalid='ignore'):
+                color = np.where(self.counts > 0, self.rgb/self.counts, 1.)
+        rgb = 1 - intensity*(1 - color)
+        rgb = rgb.T.reshape(self.height, self.width, 3)
+        return (np.clip(rgb, 0, 1)*255).astype(np.uint8)
+
+    def Save(self, filename, log=True, floor=0.2):
+        Image.fromarray(self.Image(log, floor)).save(filename, format='png')
@@ -0,0 +1,99 @@
+# Poincare sections on the fly
+# Many orbits are stepped together, and after each step the orbits whose coordinate
+# y[index] went through the section value are located with a cubic Hermite interpolant
+# over the step. Only those crossing points are kept, so memory grows with the number of
+# crossings instead of the number of steps, and runs can be made much longer.
+# Any state of shape (N, d) works: (q, p) for the Harper systems or [theta1, w1, theta2, w2]
+# for the double pendulum.
+import numpy as np
+from numpy import pi
+import time
+
+from Integrators import Hermite, HermiteRoot
+
+def PoincareSection(y0, rhs, step, h, steps, index=0, value=0., period=None, direction=1):
+    '''
+    Points where the orbits cross y[index] = value (modulo period, if given).
+
+    y0 is the (N, d) array of initial states, rhs(y) returns the (N, d) time derivatives
+    and step(y, h) the states one step later; any integrator will do. direction = 1
+    keeps crossings with y[index] increasing, -1 decreasing and 0 both.
+    Returns (orbit, t, y): orbit index, time and full state of every crossing, in the
+    order they were found.
+    '''
+    y = np.array(y0, dtype='float')
+    f = rhs(y)
+    orbits, times, points = [], [], []
+    for i in range(steps):
+        yNew = step(y.copy(), h)
+        fNew = rhs(yNew)
+        x0, x1 = y[:, index] - value, yNew[:, index] - value
+        if period is None:
+            level = np.zeros_like(x0)
+            hit = (x0 != 0) & (x0*x1 <= 0)
+        else:
+            # the step is assumed shorter than one period of the coordinate
+            n0, n1 = np.floor(x0/period), np.floor(x1/period)
+            level = np.maximum(n0, n1)*period
+            hit = (n0 != n1)
+        if direction:
+            hit &= np.sign(x1 - x0) == direction
+        hit = np.nonzero(hit)[0]
+        if hit.size:
+            s = HermiteRoot(x0[hit] - level[hit], x1[hit] - level[hit],
+                            f[hit, index], fNew[hit, index], h)
+            orbits.append(hit)
+            times.append((i + s)*h)
+            points.append(Hermite(s, y[hit], yNew[hit], f[hit], fNew[hit], h))
+        y, f = yNew, fNew
+    if not orbits:
+        return np.zeros(0, dtype=int), np.zeros(0), np.zeros((0, y.shape[1]))
+    return np.concatenate(orbits), np.concatenate(times), np.concatenate(points)
+
+def HarperSection(q0, p0, h, steps, l=-1., k=-1., index=0, value=0., period=2*pi,
+                  direction=1, scheme='pefrl'):
+    '''
+    Poincare section of the Harper system H = l cos p + k cos q (l = k = -4 for the fp/fq
+    equations of Single_PhaseSpacePlot_RK4.py), stepped with a symplectic scheme.
+    By default the section is q = 0 mod 2 pi, crossed with q increasing.
+    '''
+    from SymplecticIntegrators import Harper, SymplecticStep
+    H, dTdp, dVdq = Harper(l, k)
+    y0 = np.stack([np.ravel(q0), np.ravel(p0)], axis=1).astype('float')
+
+    def rhs(y):
+        return np.stack([dTdp(y[:, 1]), -dVdq(y[:, 0])], axis=1)
+
+    def step(y, h):
+        q, p = y[:, 0].copy(), y[:, 1].copy()
+        SymplecticStep(q, p, h, dTdp, dVdq, scheme)
+        y[:, 0], y[:, 1] = q, p
+        return y
+
+    return PoincareSection(y0, rhs, step, h, steps, index, value, period, direction)
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    from DoublePendulumEnsemble import EnsembleRK4, g
+
+    # Double pendulum with equal arms and masses, section theta1 = 0 with w1 > 0, for a
+    # fan of starts at theta1 = 0 that all have the energy of the rest state theta2 = 2.
+    n = 200
+    z0 = np.zeros((n, 4))
+    z0[:, 2] = np.linspace(0.5, 2.0, n)
+    z0[:, 1] = np.sqrt(g*(np.cos(z0[:, 2]) - np.cos(2.0)))
+    stepper = EnsembleRK4(z0, L1=1., L2=1., m1=1., m2=1.)
+
+    def step(z, h):
+        stepper.z[...] = z
+        return stepper.Step(h).copy()
+
+    begin = time.time()
+    orbit, t, y = PoincareSection(z0, lambda z: stepper.Rhs(z, np.empty_like(z)), step,
+                                  0.01, 20000, index=0, value=0., period=2*pi, direction=1)
+    print('{0} crossings of {1} orbits in {2} s.'.format(len(t), n, time.time() - begin))
+    plt.scatter(np.mod(y[:, 2] + pi, 2*pi) - pi, y[:, 3], s=0.2, c=orbit, cmap='viridis')
+    plt.xlabel('theta2 [rad]')
+    plt.ylabel('omega2 [rad/s]')
+    plt.title('Poincare section theta1 = 0, omega1 > 0')
+    plt.savefig('PoincareSection.png', format='png', dpi=150)
@@ -7,6 +7,8 @@
 import math
 import matplotlib.pylab as plt 
 
+from QuantumWalkEngine import Walker
+
 
 def probabilities(posn):
     return [sum([abs(probamp) ** 2 for probamp in ofstep]) for ofstep in posn]
@@ -23,45 +25,36 @@ def coin(posn):
 
 def shift(pos):
     newposn = [[0, 0] for i in range(len(pos))]
-    for j in range(1, len(posn)-1):
+    for j in range(1, len(pos)-1):
         newposn[j + 1][0] += pos[j][0]
         newposn[j - 1][1] += pos[j][1]
     return postmeasurement(newposn)
 
-# Initialise lists.
-Nl,Nr = -100, 100 #Taking 0 as mid point and extend -N,N
-posn = [[0, 0] for i in range(Nl+1, Nr+1)]
-#phi changes initial rotation
-phi=math.radians(45)
-posn[Nr] = [math.cos(phi), 1j*math.sin(phi)]
-#input state
-
-# Run for some steps...
-for time in range(Nr):
-    posn = shift(coin(posn))
-#Output state
-
-
-#a=math.floor(Nr*math.cos(phi))
-#print('a is:\n',a)
-# Checking if peak is alright.
-
-#Plot
-x=range(Nl+1,Nr+1)
-y=probabilities(posn)
-plt.plot(x,y,c='m')
-plt.title("Probability distribution in a Discrete Time Quantum Walk", loc='center')
-plt.xlabel("Position, coin rotation= 45 deg")
-plt.ylabel("Probability amplitudes, walker rotation=45 deg")
-#plt.axvline(a,0,1,color='r')
-#plt.axvline(-1*a,0,1,color='r')
-plt.savefig('qw1.png')
-
-
-
-
-
-
-
-
-
+if __name__ == "__main__":
+    # Initialise the walker. Sites Nl+1 .. Nr, taking 0 as mid point and extend -N,N
+    Nl,Nr = -100, 100
+    #phi changes initial rotation
+    phi=math.radians(45)
+    #input state
+    walker = Walker(Nr - Nl, Nr, [math.cos(phi), 1j*math.sin(phi)])
+    # The lists above do the same walk: posn = shift(coin(posn)) every step.
+
+    # Run for some steps...
+    walker.Step(Nr)
+    #Output state
+
+
+    #a=math.floor(Nr*math.cos(phi))
+    #print('a is:\n',a)
+    # Checking if peak is alright.
+
+    #Plot
+    x=range(Nl+1,Nr+1)
+    y=walker.Probabilities()
+    plt.plot(x,y,c='m')
+    plt.title("Probability distribution in a Discrete Time Quantum Walk", loc='center')
+    plt.xlabel("Position, coin rotation= 45 deg")
+    plt.ylabel("Probability amplitudes, walker rotation=45 deg")
+    #plt.axvline(a,0,1,color='r')
+    #plt.axvline(-1*a,0,1,color='r')
+    plt.savefig('qw1.png')
@@ -0,0 +1,165 @@
+# Scaling benchmark of the quantum walk implementations
+# Every implementation is run over a range of walk lengths N (on P = 2N + 1 sites), each
+# case repeated a number of times, every sample long enough to stand out from timer
+# noise. The minimum, median and 10/90 percentile run times per call and the peak memory
+# (from tracemalloc, in a separate run) are recorded and saved as JSON. Results can be
+# compared against a stored baseline run, and cases that got slower by more than a
+# tolerance are reported as regressions.
+#   python QuantumWalkBenchmark.py --out results.json --baseline baseline.json
+import numpy as np
+from numpy import pi
+import importlib.util
+import json
+import os
+import platform
+import time
+import timeit
+import tracemalloc
+
+import QuantumWalkEngine as Engine
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def LoadScript(filename):
+    '''import a script of this directory whose file name is not a module name'''
+    spec = importlib.util.spec_from_file_location(os.path.splitext(filename)[0].replace(' ', '_'),
+                                                  os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def ListWalk(lists, N, P, phi=45):
+    '''N steps of the list walker of "Quantum walk 1.py" started at site P//2'''
+    phi = np.radians(phi)
+    posn = [[0, 0] for i in range(P)]
+    posn[P//2] = [np.cos(phi), 1j*np.sin(phi)]
+    for _ in range(N):
+        posn = lists.shift(lists.coin(posn))
+    return lists.probabilities(posn)
+
+def Implementations(theta=pi/4, phi=45):
+    '''
+    name: (walk(N, P), largest N to run), P is the number of sites. The dense operator
+    only runs on P = 2N + 1 sites, and the momentum walk picks its own ring and returns
+    2N + 1 sites
+    '''
+    dense = LoadScript('Execution time of QW.py')
+    lists = LoadScript('Quantum walk 1.py')
+    amplitudes = [np.cos(np.radians(phi)), 1j*np.sin(np.radians(phi))]
+    return {
+        'dense': (lambda N, P: dense.QuantumWalk(N, theta, phi), 256),
+        'lists': (lambda N, P: ListWalk(lists, N, P, phi), 256),
+        'walker': (lambda N, P: Engine.Walker(P, P//2, amplitudes).Step(N).Probabilities(), 4096),
+        'engine': (lambda N, P: Engine.QuantumWalk(N, theta, phi, P), 4096),
+        'momentum': (lambda N, P: Engine.QuantumWalkMomentum(N, theta, phi), 2**20),
+    }
+
+def TimeCase(walk, N, P, repeat=5, memory=True):
+    '''
+    per call run times of repeat samples of walk(N, P), the number of calls in a
+    sample, and the peak traced memory of one more run. Every sample makes as many
+    calls as timeit.Timer.autorange finds to last at least 0.2 s, so that short cases
+    are not dominated by timer and scheduling noise
+    '''
+    timer = timeit.Timer(lambda: walk(N, P))
+    calls, _ = timer.autorange()
+    times = np.array(timer.repeat(repeat, calls))/calls
+    peak = None
+    if memory:
+        tracemalloc.start()
+        walk(N, P)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return times, calls, peak
+
+def Benchmark(Ns=(16, 64, 256, 1024, 4096, 2**16, 2**20), names=None, repeat=5,
+              memory=True, verbose=True):
+    '''
+    time every implementation (or the ones in names) for every N up to its limit, and
+    return the results as a JSON-ready dict
+    '''
+    implementations = Implementations()
+    results = []
+    for name, (walk, maxN) in implementations.items():
+        if names is not None and name not in names:
+            continue
+        for N in Ns:
+            if N > maxN:
+                continue
+            P = 2*N + 1
+            times, calls, peak = TimeCase(walk, N, P, repeat, memory)
+            result = {'implementation': name, 'N': N, 'P': P, 'repeat': repeat, 'calls': calls,
+                      'median': float(np.median(times)), 'min': float(times.min()),
+                      'p10': float(np.percentile(times, 10)), 'p90': float(np.percentile(times, 90)),
+                      'peak_bytes': peak}
+            results.append(result)
+            if verbose:
+                print('{implementation:9s} N = {N:8d}: min {min:.3e} s, median {median:.3e} s, '
+                      'p10 {p10:.3e} s, p90 {p90:.3e} s ({calls} calls a sample), peak {0}'.format(Bytes(peak), **result))
+    return {'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'platform': platform.platform(), 'processor': platform.processor()},
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': results}
+
+def Bytes(n):
+    if n is None:
+        return '-'
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return '{0:.1f} {1}'.format(n, unit)
+        n /= 1024
+
+def Save(report, filename):
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=1)
+
+def Load(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+def Compare(report, baseline, tolerance=1.25):
+    '''
+    minimum time and peak memory ratios of every case also in the baseline report, as
+    a list of (implementation, N, P, time ratio, memory ratio, regression), regression
+    being True when the case got slower or bigger by more than the factor tolerance.
+    The fastest sample is compared, as the one least disturbed by the rest of the
+    machine
+    '''
+    reference = {(r['implementation'], r['N'], r['P']): r for r in baseline['results']}
+    comparison = []
+    for r in report['results']:
+        b = reference.get((r['implementation'], r['N'], r['P']))
+        if b is None:
+            continue
+        timeRatio = r['min']/b['min']
+        memoryRatio = None
+        if r['peak_bytes'] and b['peak_bytes']:
+            memoryRatio = r['peak_bytes']/b['peak_bytes']
+        regression = timeRatio > tolerance or (memoryRatio is not None and memoryRatio > tolerance)
+        comparison.append((r['implementation'], r['N'], r['P'], timeRatio, memoryRatio, regression))
+    return comparison
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description='Scaling benchmark of the quantum walk implementations')
+    parser.add_argument('--out', default='QuantumWalkBenchmark.json', help='JSON file for the results')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='slowdown factor counted as a regression')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--N', type=int, nargs='+', default=[16, 64, 256, 1024, 4096, 2**16, 2**20])
+    parser.add_argument('--only', nargs='+', help='implementations to run')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc runs')
+    args = parser.parse_args()
+
+    report = Benchmark(args.N, args.only, args.repeat, not args.no_memory)
+    Save(report, args.out)
+    print('Results saved to', args.out)
+    if args.baseline:
+        regressions = 0
+        for name, N, P, timeRatio, memoryRatio, regression in Compare(report, Load(args.baseline), args.tolerance):
+            regressions += regression
+            print('{0:9s} N = {1:8d}: time x {2:.2f}, memory x {3}{4}'.format(
+                name, N, timeRatio, '-' if memoryRatio is None else '{0:.2f}'.format(memoryRatio),
+                '  REGRESSION' if regression else ''))
+        sys.exit(1 if regressions else 0)
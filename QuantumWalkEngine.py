@@ -0,0 +1,405 @@
+# Matrix-free discrete time quantum walk
+# QuantumWalk in "Execution time of QW.py" builds the (2P x 2P) walk operator
+# U = (I x C)(ShiftR x |0><0| + ShiftL x |1><1|) and raises it to the N-th power. Here the
+# state is kept as a (P, 2) array of amplitudes psi[x, c] instead, the shift is an index
+# shift of each coin column and the coin a 2 x 2 operation on every row, so a step costs
+# O(P) time and the walk O(N P) time and O(P) memory.
+# As in the script, coin 0 moves one site down (to lower index) and coin 1 one site up, and
+# the lattice is a ring, which agrees with the dense operator as long as the walk does not
+# reach the edges (always so for P = 2N + 1). Only the sites the walk can have reached are
+# updated, so a walk from one site costs well under N P.
+# With the same coin on every site the walk is diagonal in momentum space, and
+# MomentumEvolve takes any number of steps at once with two FFTs.
+import numpy as np
+from numpy import pi
+import time
+
+def Coin(theta, xi=0., zeta=pi/2):
+    '''
+    coin operator C_hat of the script, shape theta.shape + (2, 2). theta is in radians
+    like in the script (where theta = 45 is 45 rad, not 45 degrees)
+    '''
+    theta = np.asarray(theta, dtype='float')
+    c, s = np.cos(theta), np.sin(theta)
+    return np.stack([np.stack([np.exp(1j*xi)*c, np.exp(1j*zeta)*s], axis=-1),
+                     np.stack([np.exp(-1j*zeta)*s, -np.exp(1j*xi)*c], axis=-1)], axis=-2)
+
+def InitialState(P, phi, position=None):
+    '''
+    (P, 2) walker at one site (the centre by default) with coin state
+    cos(phi)|0> + sin(phi)|1>, phi in degrees as in the script. For an array phi the
+    result is phi.shape + (P, 2), one walker per angle
+    '''
+    phi = np.radians(np.asarray(phi, dtype='float'))
+    psi = np.zeros(phi.shape + (P, 2), dtype='complex')
+    psi[..., P//2 if position is None else position, :] = np.stack([np.cos(phi), np.sin(phi)], axis=-1)
+    return psi
+
+def Support(psi):
+    '''first and one past the last site with a nonzero amplitude'''
+    occupied = np.nonzero(np.any(psi != 0, axis=tuple(range(psi.ndim - 2)) + (psi.ndim - 1,)))[0]
+    if occupied.size == 0:
+        return 0, 0
+    return occupied[0], occupied[-1] + 1
+
+def Flush(psi, cutoff):
+    '''
+    set real and imaginary parts below cutoff to zero, in place, and return the support
+    of what is left. The far tails of a walk fall off exponentially, and if they are
+    kept they become subnormal numbers, which make every arithmetic operation on them
+    tens of times slower
+    '''
+    # through .real and .imag, which unlike a float view also work on the strided
+    # windows of a batch
+    for part in (psi.real, psi.imag):
+        part[np.abs(part) < cutoff] = 0
+    return Support(psi)
+
+def WalkStep(psi, C, a, b, local=False):
+    '''
+    one step shift then coin, in place on the (..., n, 2) amplitudes psi on a ring of
+    n sites. a and b are (..., n) complex work buffers. C is one coin per walk, or
+    with local=True a (..., n, 2, 2) array of one coin per site
+    '''
+    # coin 0 comes from the site above, coin 1 from the site below
+    a[..., :-1] = psi[..., 1:, 0]
+    a[..., -1] = psi[..., 0, 0]
+    b[..., 1:] = psi[..., :-1, 1]
+    b[..., 0] = psi[..., -1, 1]
+    if not local:
+        C = C[..., None, :, :]
+    np.multiply(C[..., 0, 0], a, out=psi[..., 0])
+    psi[..., 0] += C[..., 0, 1]*b
+    np.multiply(C[..., 1, 0], a, out=psi[..., 1])
+    psi[..., 1] += C[..., 1, 1]*b
+    return psi
+
+def EvolveStream(psi, C, steps, cutoff=1e-150, trim=64, local=False):
+    '''
+    apply U to the (..., P, 2) amplitudes psi steps times, in place, and yield
+    (n, lo, hi) after every step n: outside sites lo .. hi - 1 all amplitudes are zero.
+    Only that window of sites is updated, and every trim steps amplitudes below cutoff
+    are flushed to zero and the window narrowed to what is left (see Flush). With
+    local=True, C holds a coin for every site, shape (..., P, 2, 2)
+    '''
+    P = psi.shape[-2]
+    a = np.empty(psi.shape[:-1], dtype='complex')
+    b = np.empty(psi.shape[:-1], dtype='complex')
+    lo, hi = Support(psi)
+    for n in range(steps):
+        if cutoff and n % trim == trim - 1:
+            start, stop = Flush(psi[..., lo:hi, :], cutoff)
+            lo, hi = lo + start, lo + stop
+        lo, hi = lo - 1, hi + 1
+        if lo < 0 or hi > P:
+            lo, hi = 0, P
+        # outside [lo, hi) the amplitudes are zero, so the ring shift on the window is exact
+        WalkStep(psi[..., lo:hi, :], C[..., lo:hi, :, :] if local else C,
+                 a[..., :hi - lo], b[..., :hi - lo], local)
+        yield n + 1, lo, hi
+
+def Evolve(psi, C, steps, cutoff=1e-150, trim=64, local=False):
+    '''apply U to the (..., P, 2) amplitudes psi steps times, in place (see EvolveStream)'''
+    for _ in EvolveStream(psi, C, steps, cutoff, trim, local):
+        pass
+    return psi
+
+def MatrixPower2(M, n):
+    '''
+    n-th power of a stack (..., 2, 2) of unitary matrices in closed form. Each is
+    M = s V with s = sqrt(det M) and V in SU(2), whose eigenvalues are exp(+-i w)
+    with cos w = tr(V)/2, and V^n = U(n-1) V - U(n-2) I in terms of the Chebyshev
+    polynomials U(m) = sin((m + 1) w)/sin(w). |s| = 1 for unitary M, so only the
+    phase of s is raised to the power. The cost does not depend on n, and the phases
+    n w and n arg(s) are accurate to about n times the rounding error.
+    '''
+    a, b, c, d = M[..., 0, 0], M[..., 0, 1], M[..., 1, 0], M[..., 1, 1]
+    s = np.sqrt(a*d - b*c)
+    inv = 1/s
+    cos = ((a + d)*inv).real/2
+    # sin w from the parts of V off the identity, accurate also for w near 0 or pi
+    sin = np.sqrt(np.abs((a - d)*inv/2)**2 + np.abs(b*c*inv*inv))
+    w = np.arctan2(sin, cos)
+    small = sin < 1e-12
+    sin = np.where(small, 1., sin)
+    def Chebyshev(m):
+        # limit (m + 1) (+-1)^m where sin w vanishes
+        return np.where(small, (m + 1)*np.sign(cos)**(m % 2), np.sin((m + 1)*w)/sin)
+    # M^n = s^n (U(n-1) V - U(n-2) I) = f M - g I
+    sn = np.exp(1j*n*np.angle(s))
+    f = sn*Chebyshev(n - 1)*inv
+    g = sn*Chebyshev(n - 2)
+    Mn = np.empty(M.shape, dtype='complex')
+    Mn[..., 0, 0] = f*a - g
+    Mn[..., 0, 1] = f*b
+    Mn[..., 1, 0] = f*c
+    Mn[..., 1, 1] = f*d - g
+    return Mn
+
+def MomentumEvolve(psi, C, steps, chunk=2**16):
+    '''
+    apply U to the (..., P, 2) amplitudes psi steps times, in place, in momentum space.
+    With one coin for all sites the walk on the ring is diagonal in the Fourier
+    modes k = 2 pi m/P: the shift becomes diag(exp(ik), exp(-ik)), so U(k) = C S(k)
+    is a 2 x 2 matrix per mode and U(k)^steps is taken in closed form, chunk modes at
+    a time. Two FFTs and O(P) work whatever the number of steps; the FFTs are fastest
+    for P a power of two
+    '''
+    P = psi.shape[-2]
+    phase = np.exp(2j*pi*np.fft.fftfreq(P))
+    C = np.asarray(C)[..., None, :, :]
+    psik = np.fft.fft(psi, axis=-2)
+    for i in range(0, P, chunk):
+        e = phase[i:i + chunk]
+        U = np.empty(np.broadcast(C[..., 0, 0], e).shape + (2, 2), dtype='complex')
+        U[..., 0, 0] = C[..., 0, 0]*e
+        U[..., 1, 0] = C[..., 1, 0]*e
+        U[..., 0, 1] = C[..., 0, 1]/e
+        U[..., 1, 1] = C[..., 1, 1]/e
+        block = psik[..., i:i + chunk, :]
+        block[...] = np.einsum('...ij,...j->...i', MatrixPower2(U, steps), block)
+    psi[...] = np.fft.ifft(psik, axis=-2)
+    return psi
+
+def Propagate(psi, C, steps, local=False):
+    '''
+    apply U steps times, in place: in momentum space for one coin on all sites, and by
+    real space steps (Evolve) when local=True gives every site its own coin
+    '''
+    if local:
+        return Evolve(psi, C, steps, local=True)
+    return MomentumEvolve(psi, C, steps)
+
+def Positions(P):
+    '''site coordinates, 0 at the centre site P//2 where the walk starts'''
+    return np.arange(P) - P//2
+
+def Probabilities(psi, coin=False):
+    '''
+    position probabilities (..., P) of the amplitudes psi, or with coin=True the
+    coin-resolved (..., P, 2) probabilities of finding the walker at x with coin c
+    '''
+    probs = psi.real**2 + psi.imag**2
+    return probs if coin else probs.sum(axis=-1)
+
+def CoinPopulations(psi):
+    '''(..., 2) marginal probabilities of the two coin states'''
+    return Probabilities(psi, coin=True).sum(axis=-2)
+
+def Moments(probs, x=None):
+    '''
+    mean, variance and standard deviation (the spread) of the position distribution
+    probs, over the last axis. x defaults to Positions(P)
+    '''
+    x = Positions(probs.shape[-1]) if x is None else x
+    norm = probs.sum(axis=-1)
+    mean = probs.dot(x)/norm
+    variance = probs.dot(x*x)/norm - mean**2
+    variance = np.maximum(variance, 0.)
+    return mean, variance, np.sqrt(variance)
+
+def Entropy(probs):
+    '''Shannon entropy -sum p ln p of the position distribution, in nats'''
+    return -np.sum(probs*np.log(np.where(probs > 0, probs, 1.)), axis=-1)
+
+OBSERVABLES = ('mean', 'variance', 'spread', 'entropy', 'coin', 'return')
+
+def Observables(psi, names=OBSERVABLES, origin=None, x=None):
+    '''
+    dict of the named observables of the amplitudes psi, each with the batch shape of
+    psi (coin with an extra axis of the two coin populations). 'return' is the
+    probability at site index origin, by default the centre P//2 where walks start.
+    For a window of sites of a larger lattice, x gives their positions and origin
+    the index of the start site within the window (zero probability if outside)
+    '''
+    probs = Probabilities(psi)
+    P = probs.shape[-1]
+    out = {}
+    if {'mean', 'variance', 'spread'} & set(names):
+        mean, variance, spread = Moments(probs, x)
+        out.update(mean=mean, variance=variance, spread=spread)
+    if 'entropy' in names:
+        out['entropy'] = Entropy(probs)
+    if 'coin' in names:
+        out['coin'] = CoinPopulations(psi)
+    if 'return' in names:
+        origin = P//2 if origin is None else origin
+        out['return'] = probs[..., origin] if 0 <= origin < P else np.zeros(probs.shape[:-1])
+    return {name: out[name] for name in names}
+
+def ObservableStream(psi, C, steps, every=1, names=OBSERVABLES, origin=None, local=False):
+    '''
+    yield (n, observables) at step 0 and after every every steps up to steps, while
+    evolving psi in place. The observables are computed on the window of sites the walk
+    occupies, so recording scales like a step, and no states are kept: a single run
+    gives the whole time dependence
+    '''
+    P = psi.shape[-2]
+    x = Positions(P)
+    origin = P//2 if origin is None else origin
+    yield 0, Observables(psi, names, origin, x)
+    for n, lo, hi in EvolveStream(psi, C, steps, local=local):
+        if n % every == 0:
+            yield n, Observables(psi[..., lo:hi, :], names, origin - lo, x[lo:hi])
+
+def ObservableHistory(psi, C, steps, every=1, names=OBSERVABLES, origin=None, local=False):
+    '''ObservableStream collected into arrays, with the step numbers under 'n' '''
+    n, records = zip(*ObservableStream(psi, C, steps, every, names, origin, local))
+    history = {name: np.array([r[name] for r in records]) for name in names}
+    history['n'] = np.array(n)
+    return history
+
+def QuantumWalk(N, theta, phi, P=None):
+    '''
+    position probabilities after N steps from the centre of P = 2N + 1 sites, the same
+    result as QuantumWalk(N, theta, phi) in "Execution time of QW.py"
+    '''
+    P = 2*N + 1 if P is None else P
+    psi = Evolve(InitialState(P, phi), Coin(theta), N)
+    return Probabilities(psi)
+
+def QuantumWalkMomentum(N, theta, phi, P=None):
+    '''
+    position probabilities of sites -N .. N after N steps, like QuantumWalk, from
+    MomentumEvolve on a ring of P sites. The default P is the smallest power of two of
+    at least 2N + 1 sites, which the walk cannot wrap around. A smaller ring also works
+    as long as the tails that wrap are negligible, the Hadamard walk is exponentially
+    small beyond |x| = N/sqrt(2); then all P sites are returned, centred on the start
+    '''
+    P = 1 << (2*N).bit_length() if P is None else P
+    psi = MomentumEvolve(InitialState(P, phi), Coin(theta), N)
+    probs = Probabilities(psi)
+    if P > 2*N + 1:
+        probs = probs[P//2 - N:P//2 + N + 1]
+    return probs
+
+def QuantumWalkBatch(N, theta, phi, P=None, chunk=None):
+    '''
+    (B, P) position probabilities of B walks, for the B pairs of the broadcast theta
+    and phi arrays (flattened in C order). Each walk gets its own coin and initial
+    state, and chunk walks at a time are stepped together on a (chunk, P, 2) array. The
+    default chunk keeps that array small enough to stay in cache, which matters more
+    than the per-step overhead once a chunk has a few tens of walks
+    '''
+    theta, phi = np.broadcast_arrays(np.asarray(theta, dtype='float'), np.asarray(phi, dtype='float'))
+    theta, phi = theta.ravel(), phi.ravel()
+    P = 2*N + 1 if P is None else P
+    chunk = max(1, 2**14//P) if chunk is None else chunk
+    probs = np.empty((len(theta), P))
+    for i in range(0, len(theta), chunk):
+        psi = Evolve(InitialState(P, phi[i:i + chunk]), Coin(theta[i:i + chunk]), N)
+        probs[i:i + chunk] = Probabilities(psi)
+    return probs
+
+HADAMARD = np.array([[1., 1.], [1., -1.]])/np.sqrt(2)
+
+class Walker:
+    '''
+    Array version of the walker in "Quantum walk 1.py": amplitudes of P sites in a
+    complex (P, 2) buffer that coin and shift update in place. As in that script, coin 0
+    moves one site up and coin 1 one site down, and amplitude shifted off either end of
+    the lattice is lost. The script rescales the state to unit norm after every coin and
+    shift; with renormalize=True this is done after the shift, the only place the norm
+    can change, and with renormalize=False the lost probability is left out.
+    Only the window of sites the walker can occupy is touched, so a step costs in
+    proportion to how far the walk has spread, not to P.
+    '''
+    def __init__(self, P, site, amplitudes, coin=HADAMARD, renormalize=True,
+                 cutoff=1e-150, trim=64):
+        self.psi = np.zeros((P, 2), dtype='complex')
+        self.psi[site] = amplitudes
+        self.coin = np.asarray(coin, dtype='complex')
+        self.renormalize = renormalize
+        self.cutoff, self.trim = cutoff, trim
+        self.a = np.empty(P, dtype='complex')
+        self.lo, self.hi = site, site + 1
+        self.steps = 0
+
+    def Probabilities(self):
+        '''probabilities of every site, probabilities() of the script'''
+        return Probabilities(self.psi)
+
+    def Normalize(self):
+        '''rescale to unit total probability, postmeasurement() of the script'''
+        window = self.psi[self.lo:self.hi]
+        norm = np.sqrt(np.sum(Probabilities(window)))
+        if norm > 0:
+            window /= norm
+
+    def Coin(self):
+        '''apply the coin (the Hadamard coin of the script by default) to every site'''
+        window = self.psi[self.lo:self.hi]
+        a = self.a[:self.hi - self.lo]
+        C = self.coin
+        np.copyto(a, window[:, 0])
+        window[:, 0] *= C[0, 0]
+        window[:, 0] += C[0, 1]*window[:, 1]
+        window[:, 1] *= C[1, 1]
+        window[:, 1] += C[1, 0]*a
+
+    def Shift(self):
+        '''coin 0 one site up and coin 1 one site down, dropping the end sites'''
+        psi = self.psi
+        P = len(psi)
+        lo, hi = max(self.lo - 1, 0), min(self.hi + 1, P)
+        # sources are the sites 1 .. P - 2 only, like the loop of the script
+        up, down = max(lo, 1), min(hi, P - 1)
+        psi[up + 1:down + 1, 0] = psi[up:down, 0]
+        psi[lo:up + 1, 0] = 0
+        psi[up - 1:down - 1, 1] = psi[up:down, 1]
+        psi[down - 1:hi, 1] = 0
+        self.lo, self.hi = lo, hi
+        if self.renormalize:
+            self.Normalize()
+
+    def Step(self, steps=1):
+        '''coin then shift, steps times'''
+        for _ in range(steps):
+            self.steps += 1
+            if self.cutoff and self.steps % self.trim == 0:
+                start, stop = Flush(self.psi[self.lo:self.hi], self.cutoff)
+                self.lo, self.hi = self.lo + start, self.lo + stop
+            self.Coin()
+            self.Shift()
+        return self
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    theta, phi = pi/4, 45
+    for N, Walk in ((10**3, QuantumWalk), (10**4, QuantumWalk), (10**4, QuantumWalkMomentum),
+                    (10**6, QuantumWalkMomentum)):
+        begin = time.time()
+        probs = Walk(N, theta, phi)
+        mean, variance, spread = Moments(probs)
+        print('{0} N = {1}: {2:.2f} s, total probability {3:.12f}, spread {4:.1f} = {5:.4f} N'.format(
+            Walk.__name__, N, time.time() - begin, probs.sum(), spread, spread/N))
+    x = Positions(len(probs))
+    plt.plot(x[::2], probs[::2])
+    plt.title('Hadamard walk after {0} steps'.format(N))
+    plt.xlabel('Position')
+    plt.ylabel('Probability')
+
+    # spread after 200 steps over a grid of coin angles and initial coin states
+    N = 200
+    thetas = np.linspace(0, pi/2, 91)
+    phis = np.linspace(0, 90, 91)
+    begin = time.time()
+    probs = QuantumWalkBatch(N, thetas[:, None], phis[None, :])
+    spread = Moments(probs)[2].reshape(len(thetas), len(phis))
+    print('{0} walks of {1} steps in {2:.2f} s'.format(len(probs), N, time.time() - begin))
+    plt.figure()
+    plt.imshow(spread.T/N, origin='lower', aspect='auto',
+               extent=(thetas[0], thetas[-1], phis[0], phis[-1]))
+    plt.colorbar(label='spread / N')
+    plt.xlabel('theta [rad]')
+    plt.ylabel('phi [deg]')
+
+    # spread and return probability over time from one walk of 1000 steps
+    history = ObservableHistory(InitialState(2001, phi), Coin(theta), 1000, names=('spread', 'return'))
+    fig, (ax1, ax2) = plt.subplots(2, 1, sharex=True)
+    ax1.plot(history['n'], history['spread'])
+    ax1.set_ylabel('spread')
+    ax2.semilogy(history['n'][::2], history['return'][::2])
+    ax2.set_ylabel('return probability')
+    ax2.set_xlabel('step')
+    plt.show()
@@ -0,0 +1,117 @@
+# Exact simple pendulum
+# The undamped pendulum theta'' = -(g/l) sin(theta) has a closed-form solution in Jacobi
+# elliptic functions. With w0 = sqrt(g/l) and k^2 = omega^2/(4 w0^2) + sin^2(theta/2):
+#   libration (k < 1): sin(theta/2) = k sn(w0 t + u0 | k^2),   omega = 2 k w0 cn(w0 t + u0 | k^2)
+#   rotation   (k > 1): theta/2 = am(k w0 t + v0 | 1/k^2),     omega = 2 k w0 dn(k w0 t + v0 | 1/k^2)
+# so theta(t) and omega(t) are evaluated at any times directly, with no stepping. This
+# is also the reference solution for measuring integrator errors.
+import numpy as np
+from numpy import pi
+from scipy.special import ellipj, ellipk, ellipkinc
+from scipy.integrate import odeint, solve_ivp
+import time
+
+from Integrators import FromOdeint, RungeKutta
+
+def Modulus(theta0, omega0, g=9.81, l=1.):
+    '''k of the orbit through (theta0, omega0), below 1 for libration and above for rotation'''
+    w0 = np.sqrt(g/l)
+    return np.sqrt((omega0/(2*w0))**2 + np.sin(theta0/2)**2)
+
+def Period(theta0, omega0=0., g=9.81, l=1.):
+    '''
+    Period of the motion: a full swing for libration, one turn (theta grows by 2 pi)
+    for rotation, inf on the separatrix
+    '''
+    w0 = np.sqrt(g/l)
+    k = np.asarray(Modulus(theta0, omega0, g, l), dtype='float')
+    with np.errstate(divide='ignore'):
+        return np.where(k < 1, 4*ellipk(np.minimum(k, 1.)**2)/w0,
+                        2*ellipk(1/np.maximum(k, 1.)**2)/(k*w0))
+
+def PendulumExact(t, theta0, omega0=0., g=9.81, l=1.):
+    '''
+    theta(t), omega(t) of the undamped pendulum started at (theta0, omega0) at t = 0.
+    t, theta0 and omega0 broadcast against each other, so many times and many
+    initial conditions are evaluated in one call.
+    '''
+    t, theta0, omega0 = np.broadcast_arrays(*(np.asarray(a, dtype='float') for a in (t, theta0, omega0)))
+    w0 = np.sqrt(g/l)
+    # theta0 is reduced to (-pi, pi] and the whole turns are added back at the end
+    turns = np.round(theta0/(2*pi))
+    theta0 = theta0 - 2*pi*turns
+    k = Modulus(theta0, omega0, g, l)
+    theta = np.empty_like(t)
+    omega = np.empty_like(t)
+
+    lib = k <= 1
+    if np.any(lib):
+        kl, tl, th0, om0 = k[lib], t[lib], theta0[lib], omega0[lib]
+        m = kl**2
+        # phase u0 with k sn(u0) = sin(theta0/2), on the branch where cn(u0) has the sign of omega0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s = np.where(kl > 0, np.sin(th0/2)/kl, 0.)
+        u0 = ellipkinc(np.arcsin(np.clip(s, -1., 1.)), m)
+        K4 = 4*ellipk(m)
+        u0 = np.where(om0 < 0, K4/2 - u0, u0)
+        # sn and cn have period 4K, reducing the argument keeps ellipj accurate at long times
+        with np.errstate(invalid='ignore'):
+            u = np.where(np.isfinite(K4), np.fmod(w0*tl + u0, K4), w0*tl + u0)
+        sn, cn, dn, ph = ellipj(u, m)
+        theta[lib] = 2*np.arcsin(np.clip(kl*sn, -1., 1.))
+        omega[lib] = 2*kl*w0*cn
+
+    rot = ~lib
+    if np.any(rot):
+        kr, tr, th0, om0 = k[rot], t[rot], theta0[rot], omega0[rot]
+        m = 1/kr**2
+        sign = np.sign(om0)
+        # theta/2 = sign*am(v), with am continuous, so the angle keeps growing turn by turn
+        v0 = ellipkinc(sign*th0/2, m)
+        v = kr*w0*tr + v0
+        # take out whole periods 2K first, am(v + 2K) = am(v) + pi
+        K2 = 2*ellipk(m)
+        n = np.floor(v/K2 + 0.5)
+        sn, cn, dn, ph = ellipj(v - n*K2, m)
+        theta[rot] = sign*2*(ph + n*pi)
+        omega[rot] = sign*2*kr*w0*dn
+
+    theta += 2*pi*turns
+    return theta, omega
+
+def _Rk4(theta0, omega0, t, g, l):
+    '''fixed step RK4 of the shared integrator, one step per interval of the output grid t'''
+    y = np.array([theta0, omega0], dtype='float')
+    out = np.empty((len(t), 2))
+    out[0] = y
+    rk = RungeKutta(FromOdeint(lambda y, t: (y[1], -(g/l)*np.sin(y[0]))), 'rk4')
+    for i in range(1, len(t)):
+        out[i] = rk.Step(t[i-1], y, t[i] - t[i-1])
+    return out
+
+def IntegratorBenchmark(theta0=0., omega0=3., tstop=20., n=1000, g=9.81, l=1.):
+    '''
+    Maximum theta error and wall time of odeint, solve_ivp (RK45, DOP853) and a fixed step
+    RK4 against the exact solution, on n output points up to tstop. The default start
+    is theta0 = [0, 3] from simplePendulumRaw.py.
+    '''
+    t = np.linspace(0, tstop, n)
+    Equation = lambda y, t: [y[1], -(g/l)*np.sin(y[0])]
+    start = time.time()
+    exact = PendulumExact(t, theta0, omega0, g, l)[0]
+    results = {'exact': (0., time.time() - start)}
+    runs = [('odeint', lambda: odeint(Equation, [theta0, omega0], t)[:, 0]),
+            ('RK45', lambda: solve_ivp(lambda t, y: Equation(y, t), (0, tstop), [theta0, omega0],
+                                       t_eval=t).y[0]),
+            ('DOP853', lambda: solve_ivp(lambda t, y: Equation(y, t), (0, tstop), [theta0, omega0],
+                                         method='DOP853', t_eval=t).y[0]),
+            ('RK4', lambda: _Rk4(theta0, omega0, t, g, l)[:, 0])]
+    for name, run in runs:
+        start = time.time()
+        theta = run()
+        results[name] = (np.max(np.abs(theta - exact)), time.time() - start)
+    return results
+
+if __name__ == "__main__":
+    for name, (err, durn) in IntegratorBenchmark().items():
+        print('{0:8s} max error {1:.2e} rad, {2:.4f} s'.format(name, err, durn))
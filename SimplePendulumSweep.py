@@ -0,0 +1,88 @@
+# Simple pendulum parameter sweeps
+# Integrates every combination of amplitude, length and damping as one vectorized state,
+# theta'' = -(g/L) sin(theta) - (b/m) theta' (the Equation of simplePendulumRaw.py with
+# its damping b). The zero crossings of theta are detected as they happen, so only the
+# crossing times are stored and no trajectories. Periods and decay are derived from them.
+import numpy as np
+import time
+
+from Integrators import HermiteRoot, RungeKutta
+
+def _Rhs(y, out, gL, bm):
+    '''time derivative of the (2, n) states [theta, omega]'''
+    theta, omega = y
+    out[0] = omega
+    np.sin(theta, out=out[1])
+    out[1] *= -gL
+    out[1] -= bm*omega
+    return out
+
+def Sweep(theta0, L=1., b=0., omega0=0., g=9.81, m=1., tstop=10., dt=0.01, maxCrossings=64):
+    '''
+    Integrate all pendulums given by broadcasting theta0, L, b and omega0 together with
+    fixed step RK4 up to tstop.
+
+    Returns a dict of arrays with the broadcast shape (plus a trailing crossing axis):
+        'crossings'  times where theta changes sign, nan padded to maxCrossings
+        'count'      number of crossings found (may exceed maxCrossings)
+        'period'     2 x mean spacing of the recorded crossings, nan with fewer than 2
+        'theta', 'omega'  final state at tstop
+    '''
+    theta0, L, b, omega0 = np.broadcast_arrays(*(np.asarray(a, dtype='float')
+                                                 for a in (theta0, L, b, omega0)))
+    shape = theta0.shape
+    gL = g/L.ravel()
+    bm = b.ravel()/m
+    # theta and omega of every pendulum as the rows of one state for the shared stepper
+    y = np.stack([theta0.ravel(), omega0.ravel()])
+    yOld = np.empty_like(y)
+    rk = RungeKutta(lambda t, y, out: _Rhs(y, out, gL, bm), 'rk4')
+    n = y.shape[1]
+    crossings = np.full((n, maxCrossings), np.nan)
+    count = np.zeros(n, dtype=int)
+    nSteps = int(round(tstop/dt))
+    h = dt
+    for i in range(nSteps):
+        np.copyto(yOld, y)
+        rk.Step(i*h, y, h)
+        theta, omega = yOld
+        thetaNew, omegaNew = y
+        # sign change of theta over the step, touching zero counts at the end of the step
+        hit = np.nonzero((theta != 0) & (theta*thetaNew <= 0))[0]
+        if hit.size:
+            s = HermiteRoot(theta[hit], thetaNew[hit], omega[hit], omegaNew[hit], h)
+            slot = count[hit]
+            keep = slot < maxCrossings
+            crossings[hit[keep], slot[keep]] = (i + s[keep])*h
+            count[hit] += 1
+    theta, omega = y
+
+    with np.errstate(invalid='ignore'):
+        recorded = np.minimum(count, maxCrossings)
+        last = crossings[np.arange(n), np.maximum(recorded - 1, 0)]
+        period = np.where(recorded >= 2, 2*(last - crossings[:, 0])/(recorded - 1), np.nan)
+    return {'crossings': crossings.reshape(shape + (maxCrossings,)),
+            'count': count.reshape(shape),
+            'period': period.reshape(shape),
+            'theta': theta.reshape(shape),
+            'omega': omega.reshape(shape)}
+
+def PeriodVsAmplitude(amplitudes, L=1., b=0., g=9.81, m=1., tstop=10., dt=0.01):
+    '''period of pendulums released from rest at each amplitude, for one or many L and b'''
+    return Sweep(amplitudes, L, b, 0., g, m, tstop, dt)['period']
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    from SimplePendulumExact import Period
+
+    amplitudes = np.linspace(0.05, 3.0, 100000)
+    start = time.time()
+    period = PeriodVsAmplitude(amplitudes)
+    print('{0} pendulums swept in {1} s.'.format(amplitudes.size, time.time() - start))
+    print('Worst period error against the exact result: {0:.2e} s'.format(
+        np.nanmax(np.abs(period - Period(amplitudes)))))
+    plt.plot(np.rad2deg(amplitudes), period, c='m')
+    plt.xlabel('Amplitude (degrees)')
+    plt.ylabel('Period (s)')
+    plt.title('Period of a simple pendulum against amplitude')
+    plt.savefig('PeriodVsAmplitude.png', format='png')
@@ -0,0 +1,112 @@
+# Symplectic integrators for separable Hamiltonians
+# For H = T(p) + V(q) the flows of T and V alone are exact: a drift q += h dT/dp(p)
+# and a kick p -= h dV/dq(q). Alternating them with the right coefficients gives the
+# leapfrog (Stormer-Verlet) method and its higher order compositions. None of them
+# drifts in energy the way Euler and RK4 do, so much larger steps keep phase space clean.
+# q and p may be arrays of any shape, so whole grids of orbits are stepped at once.
+import numpy as np
+import time
+
+def Composition(weights):
+    '''
+    drift and kick coefficients of leapfrog steps of lengths weights[i]*h applied one
+    after another, with the neighbouring half drifts merged
+    '''
+    c, d = [], []
+    drift = 0.
+    for w in weights:
+        c.append(drift + w/2)
+        d.append(w)
+        drift = w/2
+    c.append(drift)
+    d.append(0.)
+    return np.array(c), np.array(d)
+
+_theta = 1/(2 - 2**(1/3))
+_xi, _lam, _chi = 0.1786178958448091, -0.2123418310626054, -0.06626458266981849
+_w6 = [0.784513610477560, 0.235573213359357, -1.17767998417887]
+_w6 = _w6 + [1 - 2*sum(_w6)] + _w6[::-1]
+
+# name: (drift coefficients c, kick coefficients d), each step applies
+# q += c[i]*h*dTdp(p) then p -= d[i]*h*dVdq(q) for every i
+SCHEMES = {
+    'euler': (np.array([1.]), np.array([1.])), # symplectic Euler, order 1
+    'leapfrog': Composition([1.]), # Stormer-Verlet, order 2
+    'forest-ruth': Composition([_theta, 1 - 2*_theta, _theta]), # Forest-Ruth / Yoshida triple jump, order 4
+    'pefrl': (np.array([_xi, _chi, 1 - 2*(_chi + _xi), _chi, _xi]), # Omelyan et al., order 4
+              np.array([(1 - 2*_lam)/2, _lam, _lam, (1 - 2*_lam)/2, 0.])),
+    'yoshida6': Composition(_w6), # Yoshida solution A, order 6
+}
+
+def Evaluations(scheme):
+    '''(dTdp, dVdq) evaluations per step'''
+    c, d = SCHEMES[scheme]
+    return int(np.count_nonzero(c)), int(np.count_nonzero(d))
+
+def SymplecticStep(q, p, h, dTdp, dVdq, scheme='leapfrog'):
+    '''advance (q, p) by one step of length h, in place for arrays, and return them'''
+    c, d = SCHEMES[scheme]
+    for ci, di in zip(c, d):
+        if ci:
+            q += ci*h*dTdp(p)
+        if di:
+            p -= di*h*dVdq(q)
+    return q, p
+
+def SymplecticStream(q0, p0, steps, h, dTdp, dVdq, scheme='leapfrog'):
+    '''yield (q, p) at the start and after each of steps steps, updated in place between yields'''
+    q = np.array(q0, dtype='float')
+    p = np.array(p0, dtype='float')
+    yield q, p
+    for _ in range(steps):
+        SymplecticStep(q, p, h, dTdp, dVdq, scheme)
+        yield q, p
+
+def Harper(l=-1., k=-1.):
+    '''
+    (H, dTdp, dVdq) of the Harper Hamiltonian H = l cos p + k cos q. The defaults are
+    HarperHamiltonianWithRK-4.py, l = k = -4 gives the fp/fq equations of
+    Single_PhaseSpacePlot_RK4.py.
+    '''
+    H = lambda q, p: l*np.cos(p) + k*np.cos(q)
+    dTdp = lambda p: -l*np.sin(p)
+    dVdq = lambda q: -k*np.sin(q)
+    return H, dTdp, dVdq
+
+def EnergyBenchmark(q0, p0, tstop=100., steps=(50, 100, 200, 400, 800, 1600), l=-1., k=-1.):
+    '''
+    Maximum energy error |H - H0| over [0, tstop] against cost for every symplectic
+    scheme and for RK4 and the script's Rk4Method update from HarperPhaseSpace, at each
+    number of steps. Cost is counted in sine evaluations (one per dT/dp or dV/dq call)
+    per orbit. Returns a list of (scheme, h, evaluations, max error, seconds).
+    '''
+    from HarperPhaseSpace import Step
+    H, dTdp, dVdq = Harper(l, k)
+    q0 = np.asarray(q0, dtype='float')
+    p0 = np.asarray(p0, dtype='float')
+    H0 = H(q0, p0)
+    results = []
+    for n in steps:
+        h = tstop/n
+        for scheme in SCHEMES:
+            begin = time.time()
+            err = 0.
+            for q, p in SymplecticStream(q0, p0, n, h, dTdp, dVdq, scheme):
+                err = max(err, np.max(np.abs(H(q, p) - H0)))
+            results.append((scheme, h, n*sum(Evaluations(scheme)), err, time.time() - begin))
+        for scheme in ('rk4', 'legacy'):
+            begin = time.time()
+            q, p = q0, p0
+            err = 0.
+            for _ in range(n):
+                q, p = Step(q, p, h, scheme, l, k)
+                err = max(err, np.max(np.abs(H(q, p) - H0)))
+            results.append((scheme, h, n*8, err, time.time() - begin))
+    return results
+
+if __name__ == "__main__":
+    from HarperPhaseSpace import ScriptGrid
+    q0, p0 = ScriptGrid()
+    print('{0:12s} {1:>8s} {2:>8s} {3:>10s} {4:>8s}'.format('scheme', 'h', 'evals', 'max dH', 'time'))
+    for scheme, h, evals, err, durn in sorted(EnergyBenchmark(q0, p0), key=lambda r: (r[0], -r[1])):
+        print('{0:12s} {1:8.4f} {2:8d} {3:10.2e} {4:8.3f}'.format(scheme, h, evals, err, durn))
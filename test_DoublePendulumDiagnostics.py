@@ -0,0 +1,41 @@
+# Tests of the energy drift diagnostics
+# Run with python -m pytest
+import numpy as np
+from numpy import pi
+
+from DoublePendulumDiagnostics import DriftTracker, EnergyDrift, EnergyScale
+from DoublePendulumEnsemble import EnsembleRK4, Energy
+
+# the start of DoublePendulum1.py: both arms horizontal at rest, so E(0) is 0 up to rounding
+L1, L2, m1, m2 = 1., 2., 3., 1.
+z0 = np.array([[pi/2, 0., pi/2, 0.]])
+
+def Trajectory(steps=1000, dt=0.01):
+    stepper = EnsembleRK4(z0, L1, L2, m1, m2)
+    z = [z0[0].copy()]
+    for _ in range(steps):
+        z.append(stepper.Step(dt)[0].copy())
+    return np.array(z)
+
+def test_horizontal_start_has_no_energy():
+    assert abs(Energy(z0[0], L1, L2, m1, m2)) < 1e-12*EnergyScale(L1, L2, m1, m2)
+
+def test_drift_of_horizontal_start_is_small():
+    drift, first = EnergyDrift(Trajectory(), L1, L2, m1, m2, threshold=1e-6)
+    assert drift[0] == 0
+    assert drift.max() < 1e-6
+    assert first == -1
+
+def test_tracker_does_not_flag_horizontal_start():
+    tracker = DriftTracker(z0, L1, L2, m1, m2, threshold=1e-6)
+    for z in Trajectory()[1:]:
+        tracker.Update(z[None])
+    assert tracker.flagged[0] == -1
+    assert tracker.maxDrift[0] < 1e-6
+
+def test_tracker_agrees_with_energy_drift():
+    z = Trajectory(200, 0.05)
+    tracker = DriftTracker(z0, L1, L2, m1, m2)
+    for state in z[1:]:
+        tracker.Update(state[None])
+    assert np.isclose(tracker.maxDrift[0], EnergyDrift(z, L1, L2, m1, m2).max())